@@ -0,0 +1,524 @@
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from models.form import rolling_form
+
+# ---------------- LIVE CONSTANTS ----------------
+# What EloEngine, MatchPredictor and LeagueManager._power_table use today
+DEFAULT_K = 20
+DEFAULT_BASE_ELO = 1500
+DEFAULT_POWER_WEIGHTS = (0.4, 0.25, 0.2, 0.15)  # elo, attack, defence, form
+DEFAULT_ELO_SCALE = 400
+DEFAULT_POWER_SCALE = 12
+DEFAULT_ELO_WEIGHT = 0.55
+DEFAULT_BASE_DRAW = 0.22
+
+PARAM_NAMES = ["k", "power_weights", "elo_scale", "power_scale", "elo_weight", "base_draw"]
+
+# Matches x configs scored per step (~64 MB of float64 per temporary)
+SCORE_BLOCK = 8_000_000
+
+CALIBRATION_BINS = 10
+PROB_EPS = 1e-15
+
+
+def default_params():
+    return {
+        "k": DEFAULT_K,
+        "power_weights": DEFAULT_POWER_WEIGHTS,
+        "elo_scale": DEFAULT_ELO_SCALE,
+        "power_scale": DEFAULT_POWER_SCALE,
+        "elo_weight": DEFAULT_ELO_WEIGHT,
+        "base_draw": DEFAULT_BASE_DRAW,
+    }
+
+
+def weight_simplex(step=0.1):
+    """Every (elo, attack, defence, form) weight set on a `step` grid summing to 1."""
+    n = int(round(1 / step))
+    return [
+        tuple(round(c * step, 10) for c in (a, b, c, n - a - b - c))
+        for a in range(n + 1) for b in range(n + 1 - a) for c in range(n + 1 - a - b)
+    ]
+
+
+# ---------------- DATA ----------------
+def prepare_matches(df, warmup=0.1):
+    """
+    Arrays a walk-forward replay needs, from a normalized date-sorted match
+    frame (date, home, away, home_goals, away_goals). The first `warmup`
+    fraction of matches only builds state and is left out of the scores.
+    Matches without a result (NaN goals) are dropped.
+    """
+    df = df[df["home_goals"].notna() & df["away_goals"].notna()]
+    n = len(df)
+    hg = df["home_goals"].to_numpy(dtype=np.float64)
+    ag = df["away_goals"].to_numpy(dtype=np.float64)
+    days = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]")
+    codes, teams = pd.factorize(
+        np.column_stack([df["home"].to_numpy(), df["away"].to_numpy()]).ravel(), use_na_sentinel=False
+    )
+
+    # Rolling form after each match, per side (home/away rows interleaved)
+    form = rolling_form(codes, np.repeat(days, 2), np.column_stack([hg, ag]).ravel(), np.column_stack([ag, hg]).ravel())
+    post = np.empty((2 * n, 3))
+    post[form["order"]] = np.column_stack([form["gf_last10"], form["ga_last10"], form["pts_last5"]])
+
+    # Matchday blocks: every match of a day is predicted from the state before it
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if n else np.empty(0, dtype=np.int64)
+    return {
+        "teams": list(teams),
+        "home_idx": codes[0::2].astype(np.int64),
+        "away_idx": codes[1::2].astype(np.int64),
+        "days": days,
+        "score_home": np.where(hg > ag, 1.0, np.where(hg < ag, 0.0, 0.5)),
+        "outcome": np.where(hg > ag, 0, np.where(hg < ag, 2, 1)),  # home / draw / away
+        "post_form": post.reshape(n, 6),  # home gf10, ga10, pts5, then away
+        "block_starts": starts,
+        "block_ends": np.r_[starts[1:], n].astype(np.int64),
+        "scored": np.arange(n) >= int(n * warmup),
+    }
+
+
+# ---------------- WALK-FORWARD REPLAY ----------------
+def _minmax(x, flat):
+    # Column-wise (x - min) / (max - min) over axis 0; `flat` where max == min
+    mn = x.min(axis=0)
+    span = x.max(axis=0) - mn
+    ok = span > 0
+    return np.where(ok, (x - mn) / np.where(ok, span, 1), flat)
+
+
+def power_scores(elo, form, weights, rows=None):
+    """
+    LeagueManager._power_table for many (K, weights) at once.
+    elo: (teams, n_k), form: (teams, 3) gf_last10 / ga_last10 / pts_last5,
+    weights: (n_w, 4) elo / attack / defence / form. Returns (teams, n_k, n_w),
+    0-100, or only `rows` of it (the scale still spans every team).
+    """
+    elo_norm = _minmax(elo, 0.5)
+    form_norm = np.column_stack([_minmax(form[:, 0], 0.5), _minmax(-form[:, 1], 0.5), _minmax(form[:, 2], 0.5)])
+    raw = elo_norm[:, :, None] * weights[:, 0] + (form_norm @ weights[:, 1:].T)[:, None, :]
+    mn = raw.min(axis=0)
+    span = raw.max(axis=0) - mn
+    if rows is not None:
+        raw = raw[rows]
+    ok = span > 0
+    return np.where(ok, 100 * (raw - mn) / np.where(ok, span, 1), 50.0)
+
+
+def _elo_block(ratings, home_idx, away_idx, score_home, ks, lo, hi, elo_diff):
+    # EloEngine.update for matches lo..hi, every K at once (ratings: teams x K)
+    for i in range(lo, hi):
+        h = home_idx[i]
+        a = away_idx[i]
+        elo_home = ratings[h].copy()
+        elo_away = ratings[a].copy()
+        elo_diff[i] = elo_home - elo_away
+        s = score_home[i]
+        expected_home = 1 / (1 + 10 ** ((elo_away - elo_home) / 400))
+        ratings[h] = elo_home + ks * (s - expected_home)
+        ratings[a] = elo_away + ks * ((1 - s) - (1 - expected_home))
+
+
+def walk_forward(data, ks, weight_sets, base_elo=DEFAULT_BASE_ELO):
+    """
+    One pass over the matches in date order, predicting each from what was
+    known before kickoff. Returns pre-match (elo_diff, power_diff):
+    elo_diff (n, len(ks)) with Elo replayed for every K as a vector dimension,
+    power_diff (n, len(ks), len(weight_sets)) from the power table as it stood
+    before the matchday (min-max over the teams seen so far; unseen teams 50).
+    """
+    ks = np.asarray(ks, dtype=np.float64)
+    weights = np.asarray(weight_sets, dtype=np.float64).reshape(-1, 4)
+    n = len(data["outcome"])
+    n_teams = len(data["teams"])
+    home, away = data["home_idx"], data["away_idx"]
+
+    ratings = np.full((n_teams, len(ks)), float(base_elo))
+    form_now = np.zeros((n_teams, 3))
+    seen = np.zeros(n_teams, dtype=bool)
+    seen_ids = np.empty(0, dtype=np.int64)
+    slot = np.full(n_teams, -1)  # team -> row of the power table (-1: not seen yet)
+
+    elo_diff = np.empty((n, len(ks)))
+    power_diff = np.zeros((n, len(ks), len(weights)))
+    for lo, hi in zip(data["block_starts"].tolist(), data["block_ends"].tolist()):
+        h, a = home[lo:hi], away[lo:hi]
+        if len(seen_ids):
+            rows = np.concatenate([slot[h], slot[a]])
+            table = power_scores(ratings[seen_ids], form_now[seen_ids], weights, np.maximum(rows, 0))
+            table[rows < 0] = 50.0
+            power_diff[lo:hi] = table[:hi - lo] - table[hi - lo:]
+
+        _elo_block(ratings, home, away, data["score_home"], ks, lo, hi, elo_diff)
+
+        # After the day: latest form per team (last write wins for a team playing twice)
+        both = np.column_stack([h, a]).ravel()
+        form_now[both] = data["post_form"][lo:hi].reshape(-1, 3)
+        new = both[~seen[both]]
+        if len(new):
+            seen[new] = True
+            seen_ids = np.flatnonzero(seen)
+            slot[seen_ids] = np.arange(len(seen_ids))
+    return elo_diff, power_diff
+
+
+def home_share(elo_diff, power_diff, elo_scale, power_scale, elo_weight):
+    """MatchPredictor's blended home share (before the draw is added)."""
+    prob_home_elo = 1 / (1 + 10 ** (-elo_diff / elo_scale))
+    prob_home_power = 1 / (1 + np.exp(-power_diff / power_scale))
+    return elo_weight * prob_home_elo + (1 - elo_weight) * prob_home_power
+
+
+def outcome_probs(final_home, base_draw):
+    """(n, 3) home / draw / away probabilities, normalized as in MatchPredictor."""
+    total = 1 + base_draw
+    return np.column_stack([final_home / total, np.full(len(final_home), base_draw / total), (1 - final_home) / total])
+
+
+# ---------------- SCORING ----------------
+def sufficient_stats(data, elo_diff, power_diff, elo_scales, power_scales, elo_weights):
+    """
+    Per-config sums over the scored matches from which log-loss and Brier
+    follow for any base_draw (see scores_from_stats), so the draw axis costs nothing.
+    Arrays are shaped (n_k, n_w, n_elo_scale, n_power_scale, n_elo_weight).
+    """
+    # Scored matches grouped home wins / draws / away wins, so each sum is a slice
+    y = data["outcome"][data["scored"]]
+    order = np.argsort(y, kind="stable")
+    n = len(y)
+    n_home = int((y == 0).sum())
+    n_away = int((y == 2).sum())
+    away_from = n - n_away
+    ed = elo_diff[data["scored"]][order]
+    pd_ = power_diff[data["scored"]][order]
+    se = np.asarray(elo_scales, dtype=np.float64)
+    sp = np.asarray(power_scales, dtype=np.float64)
+    ew = np.asarray(elo_weights, dtype=np.float64)
+    n_k, n_w = pd_.shape[1:]
+    shape = (n_k, n_w, len(se), len(sp), len(ew))
+    stats = {key: np.zeros(shape) for key in ("log_home", "log_away", "sq", "hit")}
+    stats.update({"n": n, "n_home": n_home, "n_draw": n - n_home - n_away, "n_away": n_away})
+    if n == 0:
+        return stats
+
+    step = max(1, SCORE_BLOCK // (n * len(se) * len(sp) * len(ew)))
+    for k in range(n_k):
+        p_elo = 1 / (1 + 10 ** (-ed[:, k, None] / se))  # (n, se)
+        for w0 in range(0, n_w, step):
+            p_pow = 1 / (1 + np.exp(-pd_[:, k, w0:w0 + step, None] / sp))  # (n, wc, sp)
+            wc = p_pow.shape[1]
+            # ew * p_elo + (1 - ew) * p_pow, as p_pow + ew * (p_elo - p_pow)
+            diff = p_elo[:, None, :, None] - p_pow[:, :, None, :]
+            fh = (p_pow[:, :, None, :, None] + ew * diff[..., None]).reshape(n, -1)
+            cell = (k, slice(w0, w0 + wc))
+            cell_shape = (wc,) + shape[2:]
+            home_fh = fh[:n_home]
+            away_fh = fh[away_from:]
+            total = fh.sum(axis=0)
+            stats["log_home"][cell] = np.log(np.maximum(home_fh, PROB_EPS)).sum(axis=0).reshape(cell_shape)
+            stats["log_away"][cell] = np.log(np.maximum(1 - away_fh, PROB_EPS)).sum(axis=0).reshape(cell_shape)
+            # sum of fh^2 + (1 - fh)^2 = n - 2 sum(fh) + 2 sum(fh^2)
+            stats["sq"][cell] = (n - 2 * total + 2 * np.einsum("ij,ij->j", fh, fh)).reshape(cell_shape)
+            stats["hit"][cell] = (home_fh.sum(axis=0) + n_away - away_fh.sum(axis=0)).reshape(cell_shape)
+    return stats
+
+
+def add_stats(a, b):
+    return {key: a[key] + b[key] for key in a}
+
+
+def scores_from_stats(stats, base_draws):
+    """
+    (log_loss, brier) per config with base_draw as the last axis. Brier is the
+    multi-class score: sum over home/draw/away of (p - outcome)^2, per match.
+    """
+    n, n_draw = stats["n"], stats["n_draw"]
+    d = np.asarray(base_draws, dtype=np.float64)
+    if n == 0:
+        nan = np.full(stats["sq"].shape + d.shape, np.nan)
+        return nan, nan.copy()
+    p_draw = d / (1 + d)
+    log_loss = -(stats["log_home"][..., None] + stats["log_away"][..., None]
+                 + n_draw * np.log(d) - n * np.log1p(d)) / n
+    brier = (stats["sq"][..., None] / (1 + d) ** 2 + n * p_draw ** 2
+             - 2 * stats["hit"][..., None] / (1 + d) - 2 * n_draw * p_draw + n) / n
+    return log_loss, brier
+
+
+def calibration(probs, outcome, bins=CALIBRATION_BINS):
+    """
+    Expected calibration error per outcome (|mean predicted - observed rate| per
+    probability bin, weighted by bin size) and the reliability table.
+    """
+    result = {"table": []}
+    errors = []
+    for c, name in enumerate(["home", "draw", "away"]):
+        p = probs[:, c]
+        y = (outcome == c).astype(np.float64)
+        b = np.minimum((p * bins).astype(np.int64), bins - 1)
+        count = np.bincount(b, minlength=bins)
+        pred = np.bincount(b, weights=p, minlength=bins)
+        obs = np.bincount(b, weights=y, minlength=bins)
+        ece = float(np.abs(pred - obs).sum() / max(len(p), 1))
+        result[f"ece_{name}"] = ece
+        errors.append(ece)
+        for i in np.flatnonzero(count):
+            result["table"].append({
+                "outcome": name, "bin": f"{i / bins:.1f}-{(i + 1) / bins:.1f}", "count": int(count[i]),
+                "predicted": float(pred[i] / count[i]), "observed": float(obs[i] / count[i]),
+            })
+    result["ece"] = float(np.mean(errors))
+    return result
+
+
+def evaluate(data, params):
+    """Log-loss, Brier and calibration for one config on one prepared league."""
+    elo_diff, power_diff = walk_forward(data, [params["k"]], [params["power_weights"]])
+    fh = home_share(elo_diff[:, 0], power_diff[:, 0, 0], params["elo_scale"], params["power_scale"], params["elo_weight"])
+    mask = data["scored"]
+    probs = np.clip(outcome_probs(fh, params["base_draw"])[mask], PROB_EPS, 1)
+    y = data["outcome"][mask]
+    out = {"n": int(mask.sum())}
+    if not out["n"]:
+        return out
+    onehot = np.eye(3)[y]
+    out["log_loss"] = float(-np.log(probs[np.arange(len(y)), y]).mean())
+    out["brier"] = float(((probs - onehot) ** 2).sum(axis=1).mean())
+    out.update(calibration(probs, y))
+    return out
+
+
+# ---------------- GRID SEARCH ----------------
+def _score_task(args):
+    name, data, ks, weights, w0, elo_scales, power_scales, elo_weights = args
+    elo_diff, power_diff = walk_forward(data, ks, weights)
+    return name, w0, sufficient_stats(data, elo_diff, power_diff, elo_scales, power_scales, elo_weights)
+
+
+def search(datasets, grid, workers=1):
+    """
+    Scores every config in `grid` on every prepared league in `datasets`
+    ({name: prepare_matches(...)}). grid: {"k": [...], "power_weights": [(e, a, d, f), ...],
+    "elo_scale": [...], "power_scale": [...], "elo_weight": [...], "base_draw": [...]}.
+
+    K is a vector dimension of each replay; weight sets are split into chunks
+    that run on a process pool (workers > 1). Returns {"grid", "per_dataset":
+    {name: (log_loss, brier)}, "log_loss", "brier"}: arrays indexed in
+    PARAM_NAMES order, pooled over all scored matches.
+    """
+    ks = list(grid["k"])
+    weights = [tuple(w) for w in grid["power_weights"]]
+    tasks = []
+    for name, data in datasets.items():
+        n = max(1, len(data["outcome"]))
+        chunk = max(1, min(SCORE_BLOCK // (n * len(ks)), -(-len(weights) // max(1, workers))))
+        for w0 in range(0, len(weights), chunk):
+            tasks.append((name, data, ks, weights[w0:w0 + chunk], w0,
+                          grid["elo_scale"], grid["power_scale"], grid["elo_weight"]))
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_score_task, tasks))
+    else:
+        parts = [_score_task(t) for t in tasks]
+
+    # Stitch weight chunks back together per league, then pool leagues
+    stats = {}
+    for name, w0, part in parts:
+        if name not in stats:
+            shape = (len(ks), len(weights)) + part["sq"].shape[2:]
+            stats[name] = {key: (np.zeros(shape) if np.ndim(v) else v) for key, v in part.items()}
+        for key in ("log_home", "log_away", "sq", "hit"):
+            stats[name][key][:, w0:w0 + part[key].shape[1]] = part[key]
+
+    pooled = None
+    per_dataset = {}
+    for name in datasets:
+        per_dataset[name] = scores_from_stats(stats[name], grid["base_draw"])
+        pooled = stats[name] if pooled is None else add_stats(pooled, stats[name])
+    log_loss, brier = scores_from_stats(pooled, grid["base_draw"])
+    return {"grid": {**grid, "k": ks, "power_weights": weights}, "per_dataset": per_dataset,
+            "log_loss": log_loss, "brier": brier, "n": pooled["n"]}
+
+
+def config_at(grid, index):
+    """Param dict for a multi-index into the search arrays."""
+    return {name: grid[name][i] for name, i in zip(PARAM_NAMES, index)}
+
+
+def top_configs(result, metric="log_loss", n=20):
+    """Best `n` configs by `metric` (lower is better) as a DataFrame, with both pooled scores."""
+    values = result[metric]
+    flat = values.ravel()
+    n = min(n, flat.size)
+    best = np.argpartition(flat, n - 1)[:n] if n < flat.size else np.arange(flat.size)
+    best = best[np.argsort(flat[best], kind="stable")]
+    rows = []
+    for i in best:
+        index = np.unravel_index(i, values.shape)
+        row = config_at(result["grid"], index)
+        row["log_loss"] = float(result["log_loss"][index])
+        row["brier"] = float(result["brier"][index])
+        rows.append(row)
+    return pd.DataFrame(rows, columns=PARAM_NAMES + ["log_loss", "brier"])
+
+
+def grid_size(grid):
+    return int(np.prod([len(grid[name]) for name in PARAM_NAMES]))
+
+
+# ---------------- STREAMING ----------------
+# Fields of each iter_predictions record (and write_predictions columns)
+PREDICTION_COLUMNS = [
+    "date", "home", "away", "home_goals", "away_goals", "outcome",
+    "home_win", "draw", "away_win", "elo_home", "elo_away", "power_home", "power_away",
+]
+
+# Rows buffered per write in write_predictions
+WRITE_CHUNK_ROWS = 50_000
+
+
+def iter_predictions(chunks, params=None, pts_window=5, goals_window=10):
+    """
+    Walk-forward predictions in a single pass. For each match (in the order
+    given, which should be by date): the pre-match prediction from everything
+    before its matchday, then the state update. chunks: iterable of normalized
+    match frames (e.g. schemas.iter_matches). Yields one dict per match
+    (PREDICTION_COLUMNS); state is per team, so memory does not grow with
+    the number of matches. Rows without a result are predicted, not applied.
+    Predictions match evaluate() for the same params (up to float rounding).
+    """
+    p = default_params() if params is None else params
+    k = float(p["k"])
+    weights = np.asarray(p["power_weights"], dtype=np.float64).reshape(1, 4)
+    elo_scale, power_scale = p["elo_scale"], p["power_scale"]
+    elo_weight, base_draw = p["elo_weight"], p["base_draw"]
+    total = 1 + base_draw
+
+    ids = {}
+    ratings = []                      # per team id
+    form_now = []                     # [gf_last, ga_last, pts_last] after the team's last matchday
+    windows = []                      # (gf, ga, pts) deques
+    slot = {}                         # team id -> row of the power table (teams seen so far)
+    seen_ids = []
+    touched = set()
+    table = None
+    current_day = None
+    warned = False
+
+    for chunk in chunks:
+        days = pd.to_datetime(chunk["date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+        for day, date, home, away, hg, ag in zip(
+            days.tolist(), chunk["date"].tolist(), chunk["home"].tolist(), chunk["away"].tolist(),
+            chunk["home_goals"].tolist(), chunk["away_goals"].tolist(),
+        ):
+            if day != current_day:
+                if current_day is not None and day < current_day and not warned:
+                    print(f"⚠️ Matches are not in date order (at {date}); continuing in file order.")
+                    warned = True
+                # Close the previous matchday: its results now count for the power table
+                for t in touched:
+                    gf, ga, pts = windows[t]
+                    form_now[t] = [sum(gf) / len(gf), sum(ga) / len(ga), sum(pts) / len(pts)]
+                    if t not in slot:
+                        slot[t] = len(seen_ids)
+                        seen_ids.append(t)
+                touched.clear()
+                table = None
+                current_day = day
+
+            for team in (home, away):
+                if team not in ids:
+                    ids[team] = len(ratings)
+                    ratings.append(float(DEFAULT_BASE_ELO))
+                    form_now.append([0.0, 0.0, 0.0])
+                    windows.append((deque(maxlen=goals_window), deque(maxlen=goals_window), deque(maxlen=pts_window)))
+            h, a = ids[home], ids[away]
+
+            if table is None and seen_ids:
+                elo_seen = np.array(ratings)[seen_ids][:, None]
+                table = power_scores(elo_seen, np.array(form_now)[seen_ids], weights)[:, 0, 0].tolist()
+            power_home = table[slot[h]] if h in slot else 50.0
+            power_away = table[slot[a]] if a in slot else 50.0
+
+            # MatchPredictor.predict_match (no injuries, default rest)
+            elo_home, elo_away = ratings[h], ratings[a]
+            prob_home_elo = 1 / (1 + 10 ** (-(elo_home - elo_away) / elo_scale))
+            prob_home_power = 1 / (1 + np.exp(-(power_home - power_away) / power_scale))
+            final_home = elo_weight * prob_home_elo + (1 - elo_weight) * prob_home_power
+
+            played = hg == hg and ag == ag  # not NaN
+            outcome = None
+            if played:
+                outcome = "H" if hg > ag else "A" if hg < ag else "D"
+            yield {
+                "date": date, "home": home, "away": away, "home_goals": hg, "away_goals": ag,
+                "outcome": outcome,
+                "home_win": final_home / total, "draw": base_draw / total, "away_win": (1 - final_home) / total,
+                "elo_home": elo_home, "elo_away": elo_away, "power_home": power_home, "power_away": power_away,
+            }
+            if not played:
+                continue
+
+            # State update: EloEngine.update, then the form windows
+            s = 1.0 if hg > ag else 0.0 if hg < ag else 0.5
+            expected_home = 1 / (1 + 10 ** ((elo_away - elo_home) / 400))
+            ratings[h] = elo_home + k * (s - expected_home)
+            ratings[a] = elo_away + k * ((1 - s) - (1 - expected_home))
+            for t, gf, ga in ((h, hg, ag), (a, ag, hg)):
+                w_gf, w_ga, w_pts = windows[t]
+                w_gf.append(gf)
+                w_ga.append(ga)
+                w_pts.append(3 if gf > ga else 0 if gf < ga else 1)
+                touched.add(t)
+
+
+def write_predictions(records, path, chunk_rows=WRITE_CHUNK_ROWS):
+    """
+    Writes iter_predictions records to CSV, or Parquet for a .parquet path
+    (needs pyarrow), `chunk_rows` at a time. Returns the number of rows.
+    """
+    path = Path(path)
+    parquet = path.suffix == ".parquet"
+    if parquet:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow); use a .csv path instead.") from None
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    rows = 0
+    writer = None
+    buffer = []
+
+    def flush(out):
+        nonlocal writer
+        frame = pd.DataFrame(buffer, columns=PREDICTION_COLUMNS)
+        if parquet:
+            batch = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, batch.schema)
+            writer.write_table(batch)
+        else:
+            frame.to_csv(out, index=False, header=(rows == len(buffer)))
+        buffer.clear()
+
+    with (nullcontext() if parquet else open(tmp, "w", newline="")) as out:
+        for record in records:
+            buffer.append(record)
+            rows += 1
+            if len(buffer) >= chunk_rows:
+                flush(out)
+        if buffer or rows == 0:
+            flush(out)
+    if writer is not None:
+        writer.close()
+    tmp.replace(path)
+    return rows
@@ -1,11 +1,140 @@
 import pandas as pd
 import numpy as np
 
+# Optional compiled kernel for the replay loop (falls back to pure Python)
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _replay_kernel(ratings, home_idx, away_idx, home_goals, away_goals, k, post_home, post_away):
+    # Same arithmetic (and order of operations) as EloEngine.update
+    # post_home / post_away receive each side's rating after the match
+    for i in range(len(home_idx)):
+        h = home_idx[i]
+        a = away_idx[i]
+        elo_home = ratings[h]
+        elo_away = ratings[a]
+
+        if home_goals[i] > away_goals[i]:
+            score_home, score_away = 1.0, 0.0
+        elif away_goals[i] > home_goals[i]:
+            score_home, score_away = 0.0, 1.0
+        else:
+            score_home, score_away = 0.5, 0.5
+
+        expected_home = 1 / (1 + 10 ** ((elo_away - elo_home) / 400))
+        expected_away = 1 - expected_home
+
+        ratings[h] = elo_home + k * (score_home - expected_home)
+        ratings[a] = elo_away + k * (score_away - expected_away)
+        post_home[i] = ratings[h]
+        post_away[i] = ratings[a]
+    return ratings
+
+
+_replay_kernel_jit = njit(cache=True)(_replay_kernel) if njit is not None else None
+
+
+class RatingHistory:
+    """
+    Columnar post-match rating timeline: one (team id, day, rating) entry per
+    team per match, kept sorted by team then replay order.
+    """
+
+    def __init__(self):
+        self.set_arrays(
+            np.empty(0, dtype=np.int32), np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=np.float64)
+        )
+
+    def set_arrays(self, team_idx, days, ratings):
+        """
+        Replaces the timeline (arrays sorted by team, then replay order). The
+        arrays and their search keys are swapped in as one tuple, so lookups
+        from other threads never pair new keys with old arrays and never write.
+        """
+        day_num = days.astype(np.int64)
+        day0 = day_num.min() - 1 if len(day_num) else 0
+        span = (day_num.max() - day0 + 2) if len(day_num) else 2
+        # Composite (team, day) int64 key so every lookup is one searchsorted
+        keys = team_idx.astype(np.int64) * span + (day_num - day0)
+        self._state = (team_idx, days, ratings, keys, day0, span)
+
+    @property
+    def team_idx(self):
+        return self._state[0]
+
+    @property
+    def days(self):
+        return self._state[1]
+
+    @property
+    def ratings(self):
+        return self._state[2]
+
+    def __len__(self):
+        return len(self._state[2])
+
+    def copy(self):
+        # Arrays are replaced, never written in place, so the copy can share them
+        other = RatingHistory()
+        other._state = self._state
+        return other
+
+    def append(self, home_idx, away_idx, days, post_home, post_away):
+        # Interleave home/away per match so entries stay in replay order
+        team_idx = np.concatenate([self.team_idx, np.column_stack([home_idx, away_idx]).ravel().astype(np.int32)])
+        all_days = np.concatenate([self.days, np.repeat(days, 2)])
+        ratings = np.concatenate([self.ratings, np.column_stack([post_home, post_away]).ravel()])
+        # Stable sort keeps replay order within a team
+        order = np.argsort(team_idx, kind="stable")
+        self.set_arrays(team_idx[order], all_days[order], ratings[order])
+
+    def lookup(self, team_idx, days, default):
+        """
+        Ratings entering `days` (matches strictly before that day) for each team id.
+        Team id -1 or no earlier match gives `default`.
+        """
+        hist_idx, _, ratings, keys, day0, span = self._state
+        team_idx = np.asarray(team_idx, dtype=np.int64)
+        day_num = np.clip(days.astype(np.int64) - day0, 0, span - 1)
+        qkeys = team_idx * span + day_num
+
+        pos = np.searchsorted(keys, qkeys, side="left") - 1
+        safe = np.clip(pos, 0, None)
+        found = (team_idx >= 0) & (pos >= 0)
+        if len(keys):
+            found &= hist_idx[safe] == team_idx
+        out = np.full(len(qkeys), float(default))
+        out[found] = ratings[safe[found]]
+        return out
+
+    def team_slice(self, tid):
+        team_idx, days, ratings = self._state[:3]
+        lo, hi = np.searchsorted(team_idx, [tid, tid + 1])
+        return days[lo:hi], ratings[lo:hi]
+
+
 class EloEngine:
     def __init__(self, base_elo=1500, k=20):
         self.base_elo = base_elo
         self.k = k
         self.team_elos = {}
+        # Interned team ids used by the array replay
+        self.team_ids = {}
+        self.team_names = []
+        # Post-match rating timeline, filled when replay() is given dates
+        self.history = RatingHistory()
+
+    def copy(self):
+        """Independent engine with the same ratings and history (for copy-on-write updates)."""
+        other = EloEngine(base_elo=self.base_elo, k=self.k)
+        other.team_elos = dict(self.team_elos)
+        other.team_ids = dict(self.team_ids)
+        other.team_names = list(self.team_names)
+        other.history = self.history.copy()
+        return other
 
     def get_elo(self, team):
         if team not in self.team_elos:
@@ -36,12 +165,104 @@ class EloEngine:
 
         self.team_elos[home] = new_elo_home
         self.team_elos[away] = new_elo_away
-    def compute_season(self, df):
-        for _, row in df.iterrows():
-            self.update(
-                row["home"],
-                row["away"],
-                row["home_goals"],
-                row["away_goals"]
+
+    def intern_teams(self, home, away):
+        """
+        Maps home/away team names to integer ids (stable across calls).
+        New teams get ids in order of first appearance, home before away.
+        """
+        home = np.asarray(home, dtype=object)
+        away = np.asarray(away, dtype=object)
+        interleaved = np.column_stack([home, away]).ravel()
+        codes, uniques = pd.factorize(interleaved, use_na_sentinel=False)
+
+        lookup = np.empty(len(uniques), dtype=np.int64)
+        for i, name in enumerate(uniques):
+            tid = self.team_ids.get(name)
+            if tid is None:
+                tid = len(self.team_names)
+                self.team_ids[name] = tid
+                self.team_names.append(name)
+            lookup[i] = tid
+
+        ids = lookup[codes].reshape(-1, 2)
+        return ids[:, 0], ids[:, 1]
+
+    def ratings_array(self):
+        # Current ratings in team id order (unseen teams start at base_elo)
+        return np.array(
+            [self.team_elos.get(t, self.base_elo) for t in self.team_names],
+            dtype=np.float64,
+        )
+
+    def replay(self, home, away, home_goals, away_goals, dates=None):
+        """
+        Array-backed equivalent of calling update() for every match in order.
+        Continues from the current ratings. With `dates`, post-match ratings
+        are also recorded in self.history.
+        """
+        home_idx, away_idx = self.intern_teams(home, away)
+        hg = np.asarray(home_goals, dtype=np.float64)
+        ag = np.asarray(away_goals, dtype=np.float64)
+        ratings = self.ratings_array()
+        n = len(home_idx)
+
+        if _replay_kernel_jit is not None:
+            post_home = np.empty(n, dtype=np.float64)
+            post_away = np.empty(n, dtype=np.float64)
+            ratings = _replay_kernel_jit(
+                ratings, home_idx, away_idx, hg, ag, float(self.k), post_home, post_away
+            )
+        else:
+            # Plain lists are much faster than numpy scalar indexing in a Python loop
+            post_home = [0.0] * n
+            post_away = [0.0] * n
+            ratings = np.array(
+                _replay_kernel(
+                    ratings.tolist(), home_idx.tolist(), away_idx.tolist(),
+                    hg.tolist(), ag.tolist(), self.k, post_home, post_away
+                ),
+                dtype=np.float64,
+            )
+
+        if dates is not None:
+            self.history.append(
+                home_idx, away_idx, _to_days(dates),
+                np.asarray(post_home, dtype=np.float64),
+                np.asarray(post_away, dtype=np.float64),
             )
+
+        for name, value in zip(self.team_names, ratings.tolist()):
+            self.team_elos[name] = value
+        return ratings
+
+    def compute_season(self, df):
+        self.replay(
+            df["home"].to_numpy(),
+            df["away"].to_numpy(),
+            df["home_goals"].to_numpy(),
+            df["away_goals"].to_numpy(),
+            df["date"] if "date" in df.columns else None
+        )
         return self.team_elos
+
+    # ---------------- POINT-IN-TIME ----------------
+    def rating_as_of(self, team, date):
+        """Rating `team` carried into `date` (only matches before that day count)."""
+        return float(self.ratings_as_of([team], [date])[0])
+
+    def ratings_as_of(self, teams, dates):
+        """Vectorized rating_as_of for paired sequences of teams and dates."""
+        tids = np.array([self.team_ids.get(t, -1) for t in teams], dtype=np.int64)
+        return self.history.lookup(tids, _to_days(dates), self.base_elo)
+
+    def rating_history(self, team):
+        """(dates, post-match ratings) arrays for one team, oldest first."""
+        tid = self.team_ids.get(team)
+        if tid is None:
+            return np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=np.float64)
+        return self.history.team_slice(tid)
+
+
+def _to_days(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]")
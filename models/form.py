@@ -0,0 +1,322 @@
+import numpy as np
+import pandas as pd
+
+
+def match_points(goals_for, goals_against):
+    """3 / 1 / 0 per row, from array comparisons; NaN where a score is missing."""
+    goals_for = np.asarray(goals_for, dtype=np.float64)
+    goals_against = np.asarray(goals_against, dtype=np.float64)
+    pts = np.where(goals_for > goals_against, 3.0, np.where(goals_for < goals_against, 0.0, 1.0))
+    return np.where(np.isnan(goals_for) | np.isnan(goals_against), np.nan, pts)
+
+
+def group_starts(sorted_keys):
+    """Index of the first row of each row's group, for keys already grouped together."""
+    n = len(sorted_keys)
+    first = np.ones(n, dtype=bool)
+    if n:
+        first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return np.maximum.accumulate(np.where(first, np.arange(n), 0))
+
+
+def rolling_means(values, starts, windows):
+    """
+    Trailing means within each group (pandas rolling(w, min_periods=1).mean()).
+    values: (n, k) columns, windows: one window length per column.
+    A single cumulative sum serves every column/window; integer-valued inputs
+    (goals, points) give exactly the same floats as pandas. NaN rows (matches
+    without a result) take up a window slot but are left out of the mean, and
+    a window with no result at all is NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    valid = ~np.isnan(values)
+    cs = np.zeros((n + 1, values.shape[1]))
+    np.cumsum(np.where(valid, values, 0.0), axis=0, out=cs[1:])
+    counts = np.zeros((n + 1, values.shape[1]), dtype=np.int64)
+    np.cumsum(valid, axis=0, out=counts[1:])
+
+    rows = np.arange(n)
+    out = np.empty_like(values)
+    for j, w in enumerate(windows):
+        lo = np.maximum(rows - w + 1, starts)
+        count = counts[rows + 1, j] - counts[lo, j]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[:, j] = np.where(count > 0, (cs[rows + 1, j] - cs[lo, j]) / count, np.nan)
+    return out
+
+
+def _decay_scan(values, first, decays):
+    # y[i] = x[i] + decay * y[i-1], restarting at group starts; log2(n) vectorized
+    # doubling steps for every column at once
+    y = np.array(values, dtype=np.float64)
+    coef = np.where(first[:, None], 0.0, np.asarray(decays, dtype=np.float64)[None, :])
+    coef = np.broadcast_to(coef, y.shape).copy()
+    shift = 1
+    while shift < len(y):
+        y[shift:] += coef[shift:] * y[:-shift]
+        coef[shift:] *= coef[:-shift]
+        shift *= 2
+    return y
+
+
+def ewm_means(values, starts, spans):
+    """
+    Exponentially weighted means within each group (pandas ewm(span=s).mean(),
+    adjust=True). values: (n, k) columns, spans: one span per column.
+    NaN rows get no weight but still age the earlier ones (ignore_na=False).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    first = starts == np.arange(len(values))
+    decays = [1 - 2 / (s + 1) for s in spans]
+    num = _decay_scan(np.where(valid, values, 0.0), first, decays)
+    den = _decay_scan(valid.astype(np.float64), first, decays)
+    with np.errstate(invalid="ignore"):
+        return num / den
+
+
+def rolling_form(teams, dates, goals_for, goals_against, pts_window=5, goals_window=10, ewm_spans=()):
+    """
+    Rolling form after every team-match row, computed in one grouped pass.
+
+    teams/dates/goals_for/goals_against: one row per team per match.
+    Returns a dict of arrays in (team, date) order (stable, so same-day rows
+    keep input order): "order" (row index into the inputs), "team", "date",
+    "points", "goals_for", "goals_against", f"pts_last{pts_window}",
+    f"gf_last{goals_window}", f"ga_last{goals_window}", plus "pts_ewm{s}",
+    "gf_ewm{s}", "ga_ewm{s}" for each span in ewm_spans.
+    """
+    teams = np.asarray(teams)
+    dates = np.asarray(dates)
+    order = np.lexsort((dates, teams))
+    teams, dates = teams[order], dates[order]
+    gf = np.asarray(goals_for, dtype=np.float64)[order]
+    ga = np.asarray(goals_against, dtype=np.float64)[order]
+    pts = match_points(gf, ga).astype(np.float64)
+    starts = group_starts(teams)
+
+    out = {
+        "order": order,
+        "team": teams,
+        "date": dates,
+        "points": pts,
+        "goals_for": gf,
+        "goals_against": ga,
+    }
+
+    cols = np.column_stack([pts, gf, ga])
+    rolled = rolling_means(cols, starts, [pts_window, goals_window, goals_window])
+    out[f"pts_last{pts_window}"] = rolled[:, 0]
+    out[f"gf_last{goals_window}"] = rolled[:, 1]
+    out[f"ga_last{goals_window}"] = rolled[:, 2]
+
+    if ewm_spans:
+        # Every (column, span) pair in one scan
+        spans = list(ewm_spans)
+        stacked = np.repeat(cols, len(spans), axis=1)
+        ewm = ewm_means(stacked, starts, spans * 3)
+        for c, name in enumerate(["pts", "gf", "ga"]):
+            for s_i, s in enumerate(spans):
+                out[f"{name}_ewm{s}"] = ewm[:, c * len(spans) + s_i]
+    return out
+
+
+def last_per_group(sorted_keys):
+    """Index of the last row of each group, for keys already grouped together."""
+    n = len(sorted_keys)
+    last = np.ones(n, dtype=bool)
+    if n:
+        last[:-1] = sorted_keys[1:] != sorted_keys[:-1]
+    return np.flatnonzero(last)
+
+
+def _to_days(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]")
+
+
+class FeatureStore:
+    """
+    Point-in-time rolling form: every feature as it stood after each team
+    match, kept sorted by team then match order so as-of lookups are a single
+    searchsorted. New results are appended using only each team's last few
+    rows (and last EWMA value), never a rebuild.
+    """
+
+    def __init__(self, pts_window=5, goals_window=10, ewm_spans=()):
+        self.pts_window = pts_window
+        self.goals_window = goals_window
+        self.ewm_spans = tuple(ewm_spans)
+        self.names = [f"pts_last{pts_window}", f"gf_last{goals_window}", f"ga_last{goals_window}"]
+        self.names += [f"{c}_ewm{s}" for c in ("pts", "gf", "ga") for s in self.ewm_spans]
+
+        self.team_ids = {}
+        self.team_names = []
+        self.set_arrays(
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype="datetime64[D]"),
+            np.empty((0, 3)),  # points, goals_for, goals_against
+            np.empty((0, len(self.names))),
+        )
+
+    def set_arrays(self, team_idx, days, raw, values):
+        """
+        Replaces the rows (sorted by team, then match order). Arrays and search
+        keys are swapped in as one tuple, as in RatingHistory, so lookups never write.
+        """
+        day_num = days.astype(np.int64)
+        day0 = day_num.min() - 1 if len(day_num) else 0
+        span = (day_num.max() - day0 + 2) if len(day_num) else 2
+        # Composite (team, day) int64 key, as in RatingHistory
+        keys = team_idx.astype(np.int64) * span + (day_num - day0)
+        self._state = (team_idx, days, raw, values, keys, day0, span)
+
+    @property
+    def team_idx(self):
+        return self._state[0]
+
+    @property
+    def days(self):
+        return self._state[1]
+
+    @property
+    def raw(self):
+        return self._state[2]
+
+    @property
+    def values(self):
+        return self._state[3]
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def copy(self):
+        """Independent store sharing the (never written in place) arrays."""
+        other = FeatureStore(self.pts_window, self.goals_window, self.ewm_spans)
+        other.team_ids = dict(self.team_ids)
+        other.team_names = list(self.team_names)
+        other._state = self._state
+        return other
+
+    def _intern(self, names):
+        codes, uniques = pd.factorize(np.asarray(names, dtype=object), use_na_sentinel=False)
+        lookup = np.empty(len(uniques), dtype=np.int32)
+        for i, name in enumerate(uniques):
+            tid = self.team_ids.get(name)
+            if tid is None:
+                tid = self.team_ids[name] = len(self.team_names)
+                self.team_names.append(name)
+            lookup[i] = tid
+        return lookup[codes]
+
+    def append_matches(self, df):
+        """
+        Adds a normalized match frame (date, home, away, home_goals, away_goals), in order.
+        Matches without a result (NaN goals) are skipped, as in the standings.
+        """
+        df = df[df["home_goals"].notna() & df["away_goals"].notna()]
+        hg = df["home_goals"].to_numpy(dtype=np.float64)
+        ag = df["away_goals"].to_numpy(dtype=np.float64)
+        # One row per team per match, home then away, in match order
+        teams = self._intern(np.column_stack([df["home"].to_numpy(), df["away"].to_numpy()]).ravel())
+        days = np.repeat(_to_days(df["date"]), 2)
+        gf = np.column_stack([hg, ag]).ravel()
+        ga = np.column_stack([ag, hg]).ravel()
+        raw = np.column_stack([match_points(gf, ga), gf, ga])
+        self._append_rows(teams, days, raw)
+
+    def _append_rows(self, teams, days, raw):
+        n_ctx = max(self.pts_window, self.goals_window)
+        spans = list(self.ewm_spans)
+        decays = np.array([1 - 2 / (s + 1) for s in spans] * 3)
+
+        # Context: each affected team's last n_ctx stored rows
+        touched = np.unique(teams)
+        lo = np.searchsorted(self.team_idx, touched, side="left")
+        hi = np.searchsorted(self.team_idx, touched, side="right")
+        ctx_rows = np.concatenate(
+            [np.arange(max(l, h - n_ctx), h) for l, h in zip(lo, hi)] + [np.empty(0, dtype=np.int64)]
+        ).astype(np.int64)
+
+        all_teams = np.concatenate([self.team_idx[ctx_rows], teams])
+        all_raw = np.concatenate([self.raw[ctx_rows], raw])
+        is_new = np.concatenate([np.zeros(len(ctx_rows), dtype=bool), np.ones(len(teams), dtype=bool)])
+        order = np.argsort(all_teams, kind="stable")  # context rows stay ahead of new ones
+        all_teams, all_raw, is_new = all_teams[order], all_raw[order], is_new[order]
+        starts = group_starts(all_teams)
+
+        rolled = rolling_means(all_raw, starts, [self.pts_window, self.goals_window, self.goals_window])
+        new_values = [rolled[is_new]]
+
+        if spans:
+            # Restart each team's decay scan from its last stored EWMA numerator/denominator
+            x_num = np.where(is_new[:, None], np.repeat(all_raw, len(spans), axis=1), 0.0)
+            x_den = np.where(is_new[:, None], 1.0, 0.0) * np.ones_like(x_num)
+            last_ctx = np.flatnonzero(~is_new & np.append(is_new[1:] | (all_teams[1:] != all_teams[:-1]), True))
+            if len(last_ctx):
+                t = np.searchsorted(touched, all_teams[last_ctx])
+                n_prev = hi[t] - lo[t]
+                den_prev = (1 - decays[None, :] ** n_prev[:, None]) / (1 - decays[None, :])
+                ewm_prev = self.values[hi[t] - 1, 3:]
+                x_num[last_ctx] = ewm_prev * den_prev
+                x_den[last_ctx] = den_prev
+            first = starts == np.arange(len(all_teams))
+            num = _decay_scan(x_num, first, decays)[is_new]
+            den = _decay_scan(x_den, first, decays)[is_new]
+            new_values.append(num / den)
+
+        new_values = np.column_stack(new_values)
+        new_teams = all_teams[is_new]
+        new_days = days[np.argsort(teams, kind="stable")]
+        new_raw = all_raw[is_new]
+
+        team_idx = np.concatenate([self.team_idx, new_teams])
+        order = np.argsort(team_idx, kind="stable")
+        self.set_arrays(
+            team_idx[order],
+            np.concatenate([self.days, new_days])[order],
+            np.concatenate([self.raw, new_raw])[order],
+            np.concatenate([self.values, new_values])[order],
+        )
+
+    def lookup(self, team_idx, days):
+        """
+        Feature rows entering `days` (matches strictly before that day) for each
+        team id, as a (queries x features) array; NaN where there is no earlier match.
+        """
+        store_idx, _, _, values, keys, day0, span = self._state
+        team_idx = np.asarray(team_idx, dtype=np.int64)
+        day_num = np.clip(days.astype(np.int64) - day0, 0, span - 1)
+        pos = np.searchsorted(keys, team_idx * span + day_num, side="left") - 1
+        safe = np.clip(pos, 0, None)
+        found = (team_idx >= 0) & (pos >= 0)
+        if len(keys):
+            found &= store_idx[safe] == team_idx
+        out = np.full((len(team_idx), len(self.names)), np.nan)
+        out[found] = values[safe[found]]
+        return out
+
+    def as_of_many(self, teams, dates):
+        """Features per (team, date) pair as a DataFrame (only matches before each date count)."""
+        tids = np.array([self.team_ids.get(t, -1) for t in teams], dtype=np.int64)
+        values = self.lookup(tids, _to_days(dates))
+        out = pd.DataFrame(values, columns=self.names)
+        out.insert(0, "date", pd.to_datetime(pd.Series(dates)).to_numpy())
+        out.insert(0, "team", list(teams))
+        return out
+
+    def as_of(self, team, date):
+        """{feature: value} for `team` going into `date`, or None if it had no earlier match."""
+        row = self.as_of_many([team], [date]).iloc[0]
+        if np.isnan(row[self.names[0]]):
+            return None
+        return {name: float(row[name]) for name in self.names}
+
+    def team_history(self, team):
+        """Date plus every feature after each of one team's matches, oldest first."""
+        tid = self.team_ids.get(team, -1)
+        team_idx, days, _, values = self._state[:4]
+        lo, hi = np.searchsorted(team_idx, [tid, tid + 1])
+        out = pd.DataFrame(values[lo:hi], columns=self.names)
+        out.insert(0, "date", days[lo:hi].astype("datetime64[ns]"))
+        return out
@@ -1,5 +1,42 @@
 import numpy as np
 
+
+def calculate_penalty(injuries):
+    # Apply Injury Penalties
+    if not injuries:
+        return 0
+    penalty = 0
+    for inj in injuries:
+        impact = inj.get("impact", 0) # 1-10
+        # Weighting: 10 impact = 5 power score drop
+        penalty += (impact * 0.5)
+    return penalty
+
+
+# Apply Fatigue / Context
+# Rest Days < 3: High Fatigue (-4)
+# Rest Days = 3: Med Fatigue (-2)
+# Rest Days > 7: Freshness (+2)
+def calculate_fatigue(rest_days):
+    if rest_days < 3:
+        return 4.0
+    elif rest_days == 3:
+        return 2.0
+    elif rest_days > 7:
+        return -2.0 # Negative penalty = Bonus
+    return 0.0
+
+
+def calculate_fatigue_many(rest_days):
+    # Vectorized calculate_fatigue
+    rest_days = np.asarray(rest_days)
+    return np.select(
+        [rest_days < 3, rest_days == 3, rest_days > 7],
+        [4.0, 2.0, -2.0],
+        default=0.0,
+    )
+
+
 class MatchPredictor:
     def __init__(self, elo_engine, power_lookup):
         self.elo_engine = elo_engine
@@ -15,36 +52,12 @@ class MatchPredictor:
         ps_home = self.power_lookup.get(home, 50)
         ps_away = self.power_lookup.get(away, 50)
 
-        # Apply Injury Penalties
-        def calculate_penalty(injuries):
-            if not injuries:
-                return 0
-            penalty = 0
-            for inj in injuries:
-                impact = inj.get("impact", 0) # 1-10
-                # Weighting: 10 impact = 5 power score drop
-                penalty += (impact * 0.5)
-            return penalty
-
         home_penalty = calculate_penalty(home_injuries)
         away_penalty = calculate_penalty(away_injuries)
 
         ps_home -= home_penalty
         ps_away -= away_penalty
 
-        # Apply Fatigue / Context
-        # Rest Days < 3: High Fatigue (-4)
-        # Rest Days = 3: Med Fatigue (-2)
-        # Rest Days > 7: Freshness (+2)
-        def calculate_fatigue(rest_days):
-            if rest_days < 3:
-                return 4.0
-            elif rest_days == 3:
-                return 2.0
-            elif rest_days > 7:
-                return -2.0 # Negative penalty = Bonus
-            return 0.0
-
         home_fatigue = calculate_fatigue(home_rest)
         away_fatigue = calculate_fatigue(away_rest)
 
@@ -74,3 +87,55 @@ class MatchPredictor:
             "home_fatigue": home_fatigue,
             "away_fatigue": away_fatigue
         }
+
+    def predict_many(self, homes, aways, home_impacts=0, away_impacts=0, home_rest=7, away_rest=7):
+        """
+        Vectorized predict_match over many fixtures in one NumPy pass.
+        homes/aways: sequences of team names.
+        home_impacts/away_impacts: summed injury impact per fixture (scalar or array).
+        home_rest/away_rest: rest days per fixture (scalar or array).
+        Returns a dict of columns (arrays), same keys as predict_match.
+        """
+        homes = list(homes)
+        aways = list(aways)
+        base_elo = self.elo_engine.base_elo
+        team_elos = self.elo_engine.team_elos
+        n = len(homes)
+
+        elo_home = np.fromiter((team_elos.get(t, base_elo) for t in homes), dtype=np.float64, count=n)
+        elo_away = np.fromiter((team_elos.get(t, base_elo) for t in aways), dtype=np.float64, count=n)
+        elo_diff = elo_home - elo_away
+
+        prob_home_elo = 1 / (1 + 10 ** (-elo_diff / 400))
+
+        ps_home = np.fromiter((self.power_lookup.get(t, 50) for t in homes), dtype=np.float64, count=n)
+        ps_away = np.fromiter((self.power_lookup.get(t, 50) for t in aways), dtype=np.float64, count=n)
+
+        home_penalty = np.broadcast_to(np.asarray(home_impacts, dtype=np.float64) * 0.5, (n,))
+        away_penalty = np.broadcast_to(np.asarray(away_impacts, dtype=np.float64) * 0.5, (n,))
+        home_fatigue = np.broadcast_to(calculate_fatigue_many(home_rest), (n,))
+        away_fatigue = np.broadcast_to(calculate_fatigue_many(away_rest), (n,))
+
+        ps_diff = (ps_home - home_penalty - home_fatigue) - (ps_away - away_penalty - away_fatigue)
+
+        prob_home_power = 1 / (1 + np.exp(-ps_diff / 12))
+
+        final_home = 0.55 * prob_home_elo + 0.45 * prob_home_power
+        final_away = 1 - final_home
+
+        base_draw = 0.22
+        total = final_home + final_away + base_draw
+
+        return {
+            "home": homes,
+            "away": aways,
+            "home_win": final_home / total,
+            "draw": base_draw / total,
+            "away_win": final_away / total,
+            "elo_diff": elo_diff,
+            "power_diff": ps_diff,
+            "home_penalty": home_penalty,
+            "away_penalty": away_penalty,
+            "home_fatigue": home_fatigue,
+            "away_fatigue": away_fatigue
+        }
@@ -14,15 +14,27 @@ def get_team_summary_from_tables(team_name, power_table, team_features):
         "pts_last5": float(row_feat['pts_last5']),
     }
 
-def generate_match_preview(home, away, predictor, power_table, team_features):
+def get_team_summary_from_index(team_name, team_index):
+    # team_index: { team: record } with the same fields (LeagueManager ctx["team_index"])
+    return team_index[team_name]._asdict()
+
+def generate_match_preview(home, away, predictor, power_table=None, team_features=None,
+                           team_index=None, pred=None):
     """
     Returns a human-friendly preview string using the predictor (no external LLM).
     predictor: instance of MatchPredictor
-    power_table & team_features: DataFrames (as used in your notebook)
+    power_table & team_features: DataFrames (as used in your notebook), or
+    team_index: prebuilt per-team records (skips the DataFrame scans)
+    pred: optional precomputed predict_match(home, away) result
     """
-    pred = predictor.predict_match(home, away)
-    home_stats = get_team_summary_from_tables(home, power_table, team_features)
-    away_stats = get_team_summary_from_tables(away, power_table, team_features)
+    if pred is None:
+        pred = predictor.predict_match(home, away)
+    if team_index is not None:
+        home_stats = get_team_summary_from_index(home, team_index)
+        away_stats = get_team_summary_from_index(away, team_index)
+    else:
+        home_stats = get_team_summary_from_tables(home, power_table, team_features)
+        away_stats = get_team_summary_from_tables(away, power_table, team_features)
 
     home_prob = pred['home_win'] * 100
     draw_prob = pred['draw'] * 100
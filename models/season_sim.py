@@ -0,0 +1,99 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Simulations drawn per block; keeps the (sims x fixtures) uniforms around 10-40 MB
+SIM_BLOCK = 10_000
+
+
+def _simulate_block(args):
+    """
+    Simulates `n_sims` seasons and returns a (teams x positions) count matrix
+    plus summed final points per team.
+    """
+    (n_sims, seed, p_home, p_draw, home_idx, away_idx, base_points, tiebreak) = args
+    n_teams = len(base_points)
+    n_fix = len(p_home)
+    rng = np.random.default_rng(seed)
+
+    # Fixture -> team incidence, so a whole block of tables is two matmuls
+    home_inc = np.zeros((n_fix, n_teams), dtype=np.float32)
+    away_inc = np.zeros((n_fix, n_teams), dtype=np.float32)
+    home_inc[np.arange(n_fix), home_idx] = 1
+    away_inc[np.arange(n_fix), away_idx] = 1
+
+    cut_home = p_home.astype(np.float32)
+    cut_draw = (p_home + p_draw).astype(np.float32)
+
+    counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    points_sum = np.zeros(n_teams, dtype=np.float64)
+    team_ids = np.arange(n_teams)
+
+    done = 0
+    while done < n_sims:
+        m = min(SIM_BLOCK, n_sims - done)
+        u = rng.random((m, n_fix), dtype=np.float32)
+        home_win = u < cut_home
+        draw = ~home_win & (u < cut_draw)
+        away_win = ~home_win & ~draw
+
+        home_pts = (3 * home_win + draw).astype(np.float32)
+        away_pts = (3 * away_win + draw).astype(np.float32)
+        points = base_points + home_pts @ home_inc + away_pts @ away_inc
+
+        # Rank by points, then current goal difference, then at random
+        key = points.astype(np.float64) + tiebreak + rng.random((m, n_teams)) * 1e-6
+        order = np.argsort(-key, axis=1)
+        # order[s, pos] = team  ->  count (team, pos) pairs
+        flat = order.ravel() * n_teams + np.tile(team_ids, m)
+        counts += np.bincount(flat, minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+        points_sum += points.sum(axis=0)
+        done += m
+
+    return counts, points_sum
+
+
+def simulate_season(teams, base_points, fixtures_home, fixtures_away, p_home, p_draw,
+                    n_sims=10000, seed=None, workers=1, tiebreak=None):
+    """
+    Monte Carlo over the remaining fixtures of a season.
+
+    teams: team names (table order doesn't matter)
+    base_points: current points per team, aligned with teams
+    fixtures_home/fixtures_away: team indices (into teams) per remaining fixture
+    p_home/p_draw: outcome probabilities per fixture
+    tiebreak: optional small per-team offset (e.g. scaled goal difference)
+    workers > 1 splits the simulations across a process pool.
+
+    Returns {"teams", "n_sims", "positions": (teams x positions) probabilities,
+    "expected_points"}.
+    """
+    n_teams = len(teams)
+    base_points = np.asarray(base_points, dtype=np.float32)
+    tiebreak = np.zeros(n_teams) if tiebreak is None else np.asarray(tiebreak, dtype=np.float64)
+    p_home = np.asarray(p_home, dtype=np.float64)
+    p_draw = np.asarray(p_draw, dtype=np.float64)
+    home_idx = np.asarray(fixtures_home, dtype=np.int64)
+    away_idx = np.asarray(fixtures_away, dtype=np.int64)
+
+    workers = max(1, min(int(workers), n_sims // SIM_BLOCK or 1))
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [n_sims // workers + (1 if i < n_sims % workers else 0) for i in range(workers)]
+    jobs = [
+        (share, s, p_home, p_draw, home_idx, away_idx, base_points, tiebreak)
+        for share, s in zip(shares, seeds)
+    ]
+
+    if workers == 1:
+        results = [_simulate_block(jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_block, jobs))
+
+    counts = sum(r[0] for r in results)
+    points_sum = sum(r[1] for r in results)
+    return {
+        "teams": list(teams),
+        "n_sims": n_sims,
+        "positions": counts / n_sims,
+        "expected_points": points_sum / n_sims,
+    }
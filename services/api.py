@@ -1,14 +1,39 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from typing import Optional
 import pandas as pd
+import numpy as np
 import json
+import gzip
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from services.external_data import get_injuries, role_counts, get_squad, search_team_id
+from services import external_data, metrics, profiling
+from services.response_cache import TTLCache
+from services.external_data import role_counts, get_injuries_async, get_squad_async, search_team_id_async
+
+
+# ---------------- LIFESPAN ----------------
+# Leagues are built on a thread pool once the app starts (not at import), in
+# LEAGUE_FILES order; a request for a league that isn't ready waits for its load.
+# After that a watcher rebuilds a league when its CSV changes and swaps it in.
+@asynccontextmanager
+async def lifespan(app):
+    print("Initializing Leagues...")
+    league_manager.start_loading()
+    league_manager.watch_sources()
+    try:
+        yield
+    finally:
+        league_manager.stop_watching(timeout=1)
+        await external_data.aclose()
 
 
 # ---------------- APP ----------------
-app = FastAPI(title="BallKnowledge API", version="0.1")
+app = FastAPI(title="BallKnowledge API", version="0.1", lifespan=lifespan)
+# Sync endpoints get wrapped so opt-in profiles cover their threadpool work
+app.router.route_class = profiling.ProfiledRoute
 
 print("\n🔥🔥 API FILE LOADED FROM:", __file__, "🔥🔥\n")
 
@@ -21,6 +46,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ---------------- REQUEST METRICS ----------------
+class RouteMetricsMiddleware:
+    """
+    Per-route latency histogram and status counter. Plain ASGI (no
+    BaseHTTPMiddleware), so the cost per request is a couple of microseconds.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Route template (e.g. /predict/batch), not the raw path, to keep labels bounded
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], path)
+            metrics.REQUESTS.inc(scope["method"], path, str(status[0]))
+
+app.add_middleware(RouteMetricsMiddleware)
+
+# ---------------- PROFILING ----------------
+# Off unless PROFILE_TOKENS or PROFILE_SAMPLE_RATE is set (see services/profiling.py)
+app.add_middleware(profiling.ProfilingMiddleware)
+
 # ---------------- IMPORT MODELS ----------------
 from services.league_manager import LeagueManager
 from models.preview import generate_match_preview
@@ -39,22 +101,28 @@ LEAGUE_FILES = {
     "WC": "international_matches1.csv", 
 }
 
-print("Initializing Leagues...")
+print("Registering Leagues...")
 for code, filename in LEAGUE_FILES.items():
     path = DATA_DIR / filename
     # For now, if file doesn't exist, we skip or fallback.
     # To demonstrate functionality without all files, we can optionally use the PL file for others if needed
     # but strictly we should check existence.
     if path.exists():
-        league_manager.load_league(code, path)
+        league_manager.register_league(code, path)
     else:
         print(f"⚠️ Placeholder: {code} data not found at {path}. (Upload data to enable)")
         # Fallback for Demo: Load PL data for other leagues if missing, JUST FOR DEMO purposes
         # so the UI doesn't crash if the user selects them.
         # REMOVE THIS IN PRODUCTION
         if code != "PL" and (DATA_DIR / "premier_league_2023_24.csv").exists():
-             print(f"   -> Loading PL data as fallback for {code} (DEMO MODE)")
-             league_manager.load_league(code, DATA_DIR / "premier_league_2023_24.csv")
+             print(f"   -> Using PL data as fallback for {code} (DEMO MODE)")
+             league_manager.register_league(code, DATA_DIR / "premier_league_2023_24.csv")
+
+
+@app.get("/ready")
+def ready():
+    status = league_manager.league_status()
+    return {"ready": all(s == "ready" for s in status.values()), "leagues": status}
 
 
 # ---------------- TEAM ID MAP (API-Football) ----------------
@@ -134,43 +202,152 @@ class MatchQuery(BaseModel):
     away_rest_days: int = 7
     league: str = "PL" # Default to PL
 
+class BatchFixture(BaseModel):
+    home: str
+    away: str
+    home_injuries: list[Injury] = []
+    away_injuries: list[Injury] = []
+    home_rest_days: int = 7
+    away_rest_days: int = 7
+
+class BatchQuery(BaseModel):
+    league: str = "PL"
+    fixtures: list[BatchFixture]
+
+MAX_BATCH_FIXTURES = 2000
+
+class SimFixture(BaseModel):
+    home: str
+    away: str
+
+class SimulationQuery(BaseModel):
+    league: str = "PL"
+    fixtures: Optional[list[SimFixture]] = None  # Default: every unplayed home/away pairing
+    n_sims: int = 10000
+    seed: Optional[int] = None
+
+MAX_SIMULATIONS = 200_000
+SIM_WORKERS = 1
+
+# ---------------- PREDICTION MEMO ----------------
+# /predict responses by normalized query + league generation (bounded LRU).
+# Entries for a league are dropped as soon as a new build of it is swapped in.
+PREDICT_MEMO_SIZE = 10_000
+predict_memo = TTLCache(maxsize=PREDICT_MEMO_SIZE)
+league_manager.add_swap_listener(
+    lambda code, ctx: predict_memo.invalidate(lambda key: key[0] == code)
+)
+
+def cache_metrics():
+    # Scrape-time view of the response cache / predict memo counters
+    caches = {"api_football": external_data.response_cache, "predict_memo": predict_memo}
+    stats = {name: c.stats() for name, c in caches.items()}
+    yield ("cache_entries", "gauge", "Entries currently held.",
+           [({"cache": n}, s["size"]) for n, s in stats.items()])
+    yield ("cache_lookups_total", "counter", "Lookups by result.",
+           [({"cache": n, "result": r}, s[r]) for n, s in stats.items() for r in ("hits", "misses", "coalesced")])
+    yield ("cache_evictions_total", "counter", "Entries dropped by the LRU bound.",
+           [({"cache": n}, s["evictions"]) for n, s in stats.items()])
+    yield ("cache_invalidations_total", "counter", "Entries dropped on league swaps.",
+           [({"cache": n}, s["invalidations"]) for n, s in stats.items()])
+
+def league_metrics():
+    status = league_manager.league_status()
+    yield ("league_ready", "gauge", "1 when the league context is loaded.",
+           [({"league": code}, 1 if s == "ready" else 0) for code, s in status.items()])
+    yield ("league_generation", "gauge", "Snapshot generation currently served.",
+           [({"league": code}, ctx["generation"]) for code, ctx in list(league_manager.leagues.items())])
+
+metrics.registry.add_collector(cache_metrics)
+metrics.registry.add_collector(league_metrics)
+
+def predict_memo_key(q, generation):
+    # Only impacts affect the penalty (sum of impact * 0.5), so names/positions
+    # and injury order are not part of the key
+    return (
+        q.league, generation, q.home, q.away,
+        tuple(sorted(i.impact for i in q.home_injuries)),
+        tuple(sorted(i.impact for i in q.away_injuries)),
+        q.home_rest_days, q.away_rest_days,
+    )
+
+# ---------------- CACHED PAYLOADS ----------------
+# Read-mostly responses serialized once per league generation and served
+# with an ETag (304 on If-None-Match) and a precompressed gzip variant.
+GZIP_MIN_BYTES = 1024
+_payloads = {}  # (route, league) -> {"key", "etag", "body", "gzip"}
+
+def _etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+def cached_json_response(request, route, league, key, build):
+    """
+    JSON response for build(), re-serialized only when key (the league
+    generation, plus anything else the payload depends on) changes.
+    """
+    entry = _payloads.get((route, league))
+    if entry is None or entry["key"] != key:
+        body = json.dumps(
+            build(), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        entry = {
+            "key": key,
+            "etag": '"' + "-".join([route.strip("/"), league] + [str(k) for k in key]) + '"',
+            "body": body,
+            "gzip": gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None,
+        }
+        _payloads[(route, league)] = entry
+
+    headers = {"ETag": entry["etag"], "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(request, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    if entry["gzip"] is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(entry["gzip"], media_type="application/json", headers=headers)
+    return Response(entry["body"], media_type="application/json", headers=headers)
+
 # ---------------- ROUTES ----------------
 @app.get("/teams")
-def get_teams(league: str = "PL"):
-    # Return list of teams available in our internal power_lookup for a given league
+def get_teams(request: Request, league: str = "PL"):
+    # Return list of teams available in our internal team index for a given league
     ctx = league_manager.get_league(league)
     if not ctx:
         return {"teams": []} # Or raise HTTPException
-    
-    team_names = sorted(list(ctx["power_lookup"].keys()))
-    
-    # Map to objects with IDs for Badges
-    teams_data = []
-    for name in team_names:
-        tid = TEAM_ID_MAP.get(name)
-        teams_data.append({
-            "name": name,
-            "id": tid
-        })
-        
-    return {"teams": teams_data}
+
+    def build():
+        # Map to objects with IDs for Badges
+        teams_data = []
+        for name in ctx["team_names"]:
+            tid = TEAM_ID_MAP.get(name)
+            teams_data.append({
+                "name": name,
+                "id": tid
+            })
+        return {"teams": teams_data}
+
+    # TEAM_ID_MAP only grows (IDs found by /squad, /live_data), so its size versions the badge ids
+    return cached_json_response(request, "/teams", league, (ctx["generation"], len(TEAM_ID_MAP)), build)
 
 @app.get("/squad")
-def get_team_squad(team: str):
+async def get_team_squad(team: str):
     """Get full squad roster with player photos and ratings"""
     # Resolve team name to ID
     team_id = TEAM_ID_MAP.get(team)
     
     if not team_id:
         # Try searching API
-        team_id = search_team_id(team)
+        team_id = await search_team_id_async(team)
         if team_id:
             TEAM_ID_MAP[team] = team_id  # Cache for future
     
     if not team_id:
         raise HTTPException(status_code=404, detail=f"Team '{team}' not found")
     
-    squad = get_squad(team_id)
+    squad = await get_squad_async(team_id)
     
     if not squad:
         raise HTTPException(status_code=404, detail=f"No squad data available for '{team}'")
@@ -183,21 +360,32 @@ def predict(q: MatchQuery):
     if not ctx:
         raise HTTPException(status_code=404, detail=f"League '{q.league}' not loaded or data missing.")
     
-    predictor = ctx["predictor"]
-    power_lookup = ctx["power_lookup"]
+    team_index = ctx["team_index"]
 
-    if q.home not in power_lookup or q.away not in power_lookup:
+    if q.home not in team_index or q.away not in team_index:
         # Fallback: Try to predict without power scores if teams are missing from CSV but defined
         # For now error out
         raise HTTPException(status_code=400, detail=f"Unknown team name in {q.league}: '{q.home}' or '{q.away}'")
 
-    # dict conversion for the predictor
-    h_inj = [i.dict() for i in q.home_injuries]
-    a_inj = [i.dict() for i in q.away_injuries]
-
-    res = predictor.predict_match(
-        q.home, q.away, h_inj, a_inj, q.home_rest_days, q.away_rest_days
+    return predict_memo.get_or_fetch(
+        predict_memo_key(q, ctx["generation"]), float("inf"), lambda: _predict_uncached(q, ctx)
     )
+
+def _predict_uncached(q, ctx):
+    # Everything comes from ctx, the context whose generation keys the memo
+    res = None
+    if not q.home_injuries and not q.away_injuries and q.home_rest_days == 7 and q.away_rest_days == 7:
+        # Default inputs: O(1) lookup in the league's precomputed matrix
+        res = league_manager.default_prediction(q.league, q.home, q.away, ctx)
+
+    if res is None:
+        # dict conversion for the predictor
+        h_inj = [i.dict() for i in q.home_injuries]
+        a_inj = [i.dict() for i in q.away_injuries]
+
+        res = ctx["predictor"].predict_match(
+            q.home, q.away, h_inj, a_inj, q.home_rest_days, q.away_rest_days
+        )
     return {
         "home": res["home"],
         "away": res["away"],
@@ -212,41 +400,141 @@ def predict(q: MatchQuery):
         "away_fatigue": round(res.get("away_fatigue", 0), 1),
     }
 
+@app.post("/predict/batch")
+def predict_batch(q: BatchQuery):
+    ctx = league_manager.get_league(q.league)
+    if not ctx:
+        raise HTTPException(status_code=404, detail=f"League '{q.league}' not loaded or data missing.")
+
+    if len(q.fixtures) > MAX_BATCH_FIXTURES:
+        raise HTTPException(status_code=400, detail=f"Too many fixtures ({len(q.fixtures)}), max is {MAX_BATCH_FIXTURES}.")
+
+    team_index = ctx["team_index"]
+    unknown = sorted({t for f in q.fixtures for t in (f.home, f.away) if t not in team_index})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown team name(s) in {q.league}: {unknown}")
+
+    # Columnar inputs for one vectorized pass
+    res = ctx["predictor"].predict_many(
+        [f.home for f in q.fixtures],
+        [f.away for f in q.fixtures],
+        [sum(i.impact for i in f.home_injuries) for f in q.fixtures],
+        [sum(i.impact for i in f.away_injuries) for f in q.fixtures],
+        [f.home_rest_days for f in q.fixtures],
+        [f.away_rest_days for f in q.fixtures],
+    )
+    return {
+        "league": q.league,
+        "home": res["home"],
+        "away": res["away"],
+        "home_win": np.round(res["home_win"] * 100, 1).tolist(),
+        "draw": np.round(res["draw"] * 100, 1).tolist(),
+        "away_win": np.round(res["away_win"] * 100, 1).tolist(),
+        "elo_diff": np.round(res["elo_diff"], 1).tolist(),
+        "power_diff": np.round(res["power_diff"], 1).tolist(),
+        "home_penalty": np.round(res["home_penalty"], 1).tolist(),
+        "away_penalty": np.round(res["away_penalty"], 1).tolist(),
+        "home_fatigue": np.round(res["home_fatigue"], 1).tolist(),
+        "away_fatigue": np.round(res["away_fatigue"], 1).tolist(),
+    }
+
+@app.get("/predict/matrix")
+def predict_matrix(league: str = "PL"):
+    # Default-input probabilities for every ordered fixture (row = home, column = away)
+    ctx = league_manager.get_league(league)
+    if not ctx:
+        raise HTTPException(status_code=404, detail=f"League '{league}' not loaded or data missing.")
+    matrix = ctx.get("prob_matrix")
+    if matrix is None:
+        raise HTTPException(status_code=400, detail=f"League '{league}' has too many teams for a fixture matrix.")
+
+    def grid(arr):
+        rows = np.round(arr * 100, 1).tolist()
+        for i, row in enumerate(rows):
+            row[i] = None  # a team can't play itself
+        return rows
+
+    return {
+        "league": league,
+        "teams": matrix["teams"],
+        "home_win": grid(matrix["home_win"]),
+        "draw": grid(matrix["draw"]),
+        "away_win": grid(matrix["away_win"]),
+    }
+
+@app.post("/simulate")
+def simulate(q: SimulationQuery):
+    ctx = league_manager.get_league(q.league)
+    if not ctx:
+        raise HTTPException(status_code=404, detail=f"League '{q.league}' not loaded or data missing.")
+    if not 1 <= q.n_sims <= MAX_SIMULATIONS:
+        raise HTTPException(status_code=400, detail=f"n_sims must be between 1 and {MAX_SIMULATIONS}.")
+
+    fixtures = None
+    if q.fixtures is not None:
+        fixtures = [(f.home, f.away) for f in q.fixtures]
+        known = ctx["standings"]["table"]
+        unknown = sorted({t for f in fixtures for t in f if t not in known})
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown team name(s) in {q.league}: {unknown}")
+
+    try:
+        sim = league_manager.simulate_season(q.league, fixtures, n_sims=q.n_sims, seed=q.seed, workers=SIM_WORKERS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    n_teams = len(sim["teams"])
+    positions = sim["positions"]
+    table = ctx["standings"]["table"]
+    rows = []
+    for i, team in enumerate(sim["teams"]):
+        rows.append({
+            "team": team,
+            "points": table[team]["points"] if team in table else 0,
+            "expected_points": round(float(sim["expected_points"][i]), 1),
+            "title": round(float(positions[i, 0]) * 100, 1),
+            "top4": round(float(positions[i, :4].sum()) * 100, 1),
+            "relegation": round(float(positions[i, max(n_teams - 3, 0):].sum()) * 100, 1),
+            "positions": np.round(positions[i] * 100, 2).tolist(),
+        })
+    rows.sort(key=lambda r: r["expected_points"], reverse=True)
+    return {"league": q.league, "n_sims": sim["n_sims"], "table": rows}
+
 @app.get("/preview")
 def preview(home: str, away: str, league: str = "PL"):
     ctx = league_manager.get_league(league)
     if not ctx:
         raise HTTPException(status_code=404, detail="League not found")
         
-    predictor = ctx["predictor"]
-    power_table = ctx["power_table"]
-    elo_df = ctx["elo_df"]
-    final_stats = ctx["final_stats"]
-    
-    # We need a merged dataframe for generate_match_preview
-    # In initial code it was: final_stats.merge(elo_df, on="team")
-    # In LeagueManager we have them.
-    merged = final_stats.merge(elo_df, on="team")
+    team_index = ctx["team_index"]
+    if home not in team_index or away not in team_index:
+        raise HTTPException(status_code=400, detail=f"Unknown team name in {league}: '{home}' or '{away}'")
 
+    # Per-team records and the default-input prediction are both prebuilt per snapshot
     text = generate_match_preview(
-        home, away, predictor, power_table, merged
+        home, away, ctx["predictor"],
+        team_index=team_index,
+        pred=league_manager.default_prediction(league, home, away, ctx),
     )
     return {"preview": text}
 
 @app.get("/power_table")
-def get_power_table(league: str = "PL"):
+def get_power_table(request: Request, league: str = "PL"):
     ctx = league_manager.get_league(league)
     if not ctx:
         return []
-    return ctx["power_table"].to_dict(orient="records")
+    return cached_json_response(
+        request, "/power_table", league, (ctx["generation"],),
+        lambda: ctx["power_table"].to_dict(orient="records"),
+    )
 # ---------------- AUTO INJURIES ----------------
 @app.get("/auto_injuries")
-def auto_injuries(team: str):
+async def auto_injuries(team: str):
     if team not in TEAM_ID_MAP:
         raise HTTPException(status_code=400, detail="Team not mapped yet")
 
     team_id = TEAM_ID_MAP[team]
-    injuries = get_injuries(team_id)
+    injuries = await get_injuries_async(team_id)
     roles = role_counts(injuries)
 
     return {
@@ -256,20 +544,43 @@ def auto_injuries(team: str):
     }
 
 # ---------------- LIVE DATA ----------------
-from services.external_data import get_last_match_date, search_team_id, get_lineup
+import asyncio
+from services.external_data import get_last_match_date_async, get_lineup_async
 from datetime import datetime
 import pytz
 
+def calc_rest(last_date_str):
+    if not last_date_str:
+        return 7 # Default
+
+    # Parse ISO format: 2024-04-20T15:00:00+00:00
+    # We need to be careful with timezones.
+    try:
+        last_date = datetime.fromisoformat(last_date_str)
+        # For this project, we'll assume "Now" is the time of the request
+        # But since the data is 2023-24 season, "Now" might be far ahead.
+        # If the gap is huge (> 30 days), assume it's a new season or break -> 7 days.
+        now = datetime.now(pytz.utc)
+        delta = (now - last_date).days
+
+        if delta > 30 or delta < 0:
+            return 7
+        return max(1, delta)
+    except Exception as e:
+        print(f"Date parse error: {e}")
+        return 7
+
 @app.get("/live_data")
-def live_data(home: str, away: str):
-    # Dynamic ID resolution
-    for team_name in [home, away]:
-        if team_name not in TEAM_ID_MAP:
-            print(f"Searching API for ID of '{team_name}'...")
-            found_id = search_team_id(team_name)
+async def live_data(home: str, away: str):
+    # Dynamic ID resolution (both searches in flight together)
+    missing = [t for t in dict.fromkeys([home, away]) if t not in TEAM_ID_MAP]
+    if missing:
+        print(f"Searching API for ID of {missing}...")
+        found = await asyncio.gather(*(search_team_id_async(t) for t in missing))
+        for team_name, found_id in zip(missing, found):
             if found_id:
                 TEAM_ID_MAP[team_name] = found_id
-                print(f" -> Found ID: {found_id}")
+                print(f" -> Found ID for '{team_name}': {found_id}")
             else:
                 print(f" -> ID not found for '{team_name}'")
 
@@ -279,46 +590,52 @@ def live_data(home: str, away: str):
     hid = TEAM_ID_MAP[home]
     aid = TEAM_ID_MAP[away]
 
-    # 1. Injuries
-    h_inj = get_injuries(hid)
-    a_inj = get_injuries(aid)
-
-    # 2. Lineups (Active/Last Match)
-    h_lineup = get_lineup(hid)
-    a_lineup = get_lineup(aid)
-
-    # 3. Rest Days Calculation
-    def calc_rest(tid):
-        last_date_str = get_last_match_date(tid)
-        if not last_date_str:
-            return 7 # Default
-        
-        # Parse ISO format: 2024-04-20T15:00:00+00:00
-        # We need to be careful with timezones.
-        try:
-            last_date = datetime.fromisoformat(last_date_str)
-            # For this project, we'll assume "Now" is the time of the request
-            # But since the data is 2023-24 season, "Now" might be far ahead.
-            # If the gap is huge (> 30 days), assume it's a new season or break -> 7 days.
-            now = datetime.now(pytz.utc)
-            delta = (now - last_date).days
-            
-            if delta > 30 or delta < 0:
-                return 7
-            return max(1, delta)
-        except Exception as e:
-            print(f"Date parse error: {e}")
-            return 7
-
-    h_rest = calc_rest(hid)
-    a_rest = calc_rest(aid)
+    # Injuries, lineups (active/last match) and last match dates for both teams,
+    # all independent -> one concurrent fan-out
+    h_inj, a_inj, h_lineup, a_lineup, h_last, a_last = await asyncio.gather(
+        get_injuries_async(hid),
+        get_injuries_async(aid),
+        get_lineup_async(hid),
+        get_lineup_async(aid),
+        get_last_match_date_async(hid),
+        get_last_match_date_async(aid),
+    )
 
     return {
         "home_injuries": h_inj,
         "away_injuries": a_inj,
         "home_lineup": h_lineup,
         "away_lineup": a_lineup,
-        "home_rest": h_rest,
-        "away_rest": a_rest
+        "home_rest": calc_rest(h_last),
+        "away_rest": calc_rest(a_last)
     }
 
+@app.get("/cache_stats")
+def get_cache_stats():
+    # Counters (size, hits, misses, hit_rate, evictions, ...) per cache
+    return {
+        "api_football": external_data.cache_stats(),
+        "predict_memo": predict_memo.stats(),
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    # Prometheus text exposition: load stages, routes, upstream calls, caches, leagues
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(request: Request, profile_id: str, sort: str = "cumulative", limit: int = 40, raw: bool = False):
+    # Report for a profiled request (X-Profile-Id); raw=true returns the .prof file
+    if not profiling.authorized(request.headers.get("x-profile-token")):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+    path = profiling.find(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if raw:
+        return Response(path.read_bytes(), media_type="application/octet-stream",
+                        headers={"Content-Disposition": f'attachment; filename="{path.name}"'})
+    try:
+        text = profiling.report(profiling.aggregate([path]), sort, limit)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort}")
+    return Response(text, media_type="text/plain; charset=utf-8")
@@ -1,6 +1,14 @@
 import os
+import asyncio
+import random
+import time
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
+from services import metrics
+from services.response_cache import TTLCache
 
 load_dotenv()
 API_KEY = os.getenv("API_FOOTBALL_KEY")
@@ -11,33 +19,181 @@ HEADERS = {
 }
 BASE_URL = "https://v3.football.api-sports.io"
 
-def get_injuries(team_id, season=2024):
-    if not API_KEY:
-        print("Warning: No API Key found.")
-        return []
-        
-    url = f"{BASE_URL}/injuries"
-    params = {"team": team_id, "season": season}
+# ---------------- HTTP CLIENTS ----------------
+# Seconds per upstream call; retries back off 0.25s, 0.5s, ... on errors/429/5xx
+# and on rate-limit errors in a 200 body
+DEFAULT_TIMEOUT = 5.0
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.25
+RETRY_STATUS = {429, 500, 502, 503, 504}
+POOL_SIZE = 20
+
+# Sync callers (tools, scripts): one keep-alive session with the same policy
+_session = requests.Session()
+_session.headers.update(HEADERS)
+_session.mount("https://", HTTPAdapter(
+    pool_maxsize=POOL_SIZE,
+    max_retries=Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_BASE,
+        status_forcelist=sorted(RETRY_STATUS),
+        allowed_methods=["GET"],
+    ),
+))
+
+# Async callers (API routes): one pooled client per event loop
+_async_client = None
+_async_client_loop = None
+
+# ---------------- RESPONSE CACHE ----------------
+# Seconds each endpoint's responses stay fresh (injuries/squads/lineups barely move in an hour)
+CACHE_TTLS = {
+    "/injuries": 3600,
+    "/players/squads": 3600,
+    "/fixtures": 1800,
+    "/fixtures/lineups": 3600,
+    "/teams": 24 * 3600,
+}
+CACHE_MAXSIZE = 2048
+
+response_cache = TTLCache(maxsize=CACHE_MAXSIZE)
+
+
+class UpstreamError(Exception):
+    """
+    API-Football reports quota, rate-limit and parameter errors as HTTP 200 with
+    an empty `response` and a non-empty `errors` field; raised so such answers
+    are never cached (or mistaken for "not found").
+    """
+
+    def __init__(self, path, errors):
+        self.errors = errors
+        # {"rateLimit": "Too many requests..."} clears within a minute; the daily
+        # {"requests": ...} quota and bad parameters don't
+        self.rate_limited = isinstance(errors, dict) and "rateLimit" in errors
+        super().__init__(f"{path}: {errors}")
+
+
+def _payload(r):
+    """(metrics outcome, parsed body) of a finished request; errors=[] / {} means none."""
+    if r.status_code >= 400:
+        return str(r.status_code), None
+    body = r.json()
+    return ("api_error" if body.get("errors") else str(r.status_code)), body
+
+
+def _response(path, body):
+    if body.get("errors"):
+        raise UpstreamError(path, body["errors"])
+    return body.get("response", [])
+
+
+def _cache_key(path, params):
+    return (path, tuple(sorted(params.items())))
+
+
+def cache_stats():
+    return response_cache.stats()
+
+
+def _get(path, params, timeout=DEFAULT_TIMEOUT):
+    def fetch():
+        # urllib3 retries HTTP errors inside one call; rate-limit bodies (HTTP 200)
+        # get the same backoff here
+        for attempt in range(MAX_RETRIES + 1):
+            start = time.perf_counter()
+            try:
+                r = _session.get(f"{BASE_URL}{path}", params=params, timeout=timeout)
+            except requests.RequestException:
+                metrics.UPSTREAM_REQUESTS.inc(path, "error")
+                raise
+            finally:
+                metrics.UPSTREAM_SECONDS.observe(time.perf_counter() - start, path)
+            outcome, body = _payload(r)
+            metrics.UPSTREAM_REQUESTS.inc(path, outcome)
+            r.raise_for_status()
+            try:
+                return _response(path, body)
+            except UpstreamError as e:
+                if not e.rate_limited or attempt == MAX_RETRIES:
+                    raise
+            time.sleep(BACKOFF_BASE * (2 ** attempt) * (1 + random.random() * 0.1))
+
+    return response_cache.get_or_fetch(_cache_key(path, params), CACHE_TTLS.get(path, 0), fetch)
+
+
+def _get_async_client():
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            headers={k: v for k, v in HEADERS.items() if v is not None},
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def _aget(path, params, timeout=DEFAULT_TIMEOUT):
+    return await response_cache.get_or_fetch_async(
+        _cache_key(path, params),
+        CACHE_TTLS.get(path, 0),
+        lambda: _aget_uncached(path, params, timeout),
+    )
+
+
+async def _aget_uncached(path, params, timeout):
+    client = _get_async_client()
+    for attempt in range(MAX_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            r = await client.get(path, params=params, timeout=timeout)
+            metrics.UPSTREAM_SECONDS.observe(time.perf_counter() - start, path)
+            outcome, body = _payload(r)
+            metrics.UPSTREAM_REQUESTS.inc(path, outcome)
+            if r.status_code not in RETRY_STATUS or attempt == MAX_RETRIES:
+                # Error responses (HTTP or in the body) raise so they are never cached
+                r.raise_for_status()
+                return _response(path, body)
+        except UpstreamError as e:
+            # Rate-limit bodies back off like a 429
+            if not e.rate_limited or attempt == MAX_RETRIES:
+                raise
+        except httpx.TransportError:
+            metrics.UPSTREAM_SECONDS.observe(time.perf_counter() - start, path)
+            metrics.UPSTREAM_REQUESTS.inc(path, "error")
+            if attempt == MAX_RETRIES:
+                raise
+        # Exponential backoff with a little jitter
+        await asyncio.sleep(BACKOFF_BASE * (2 ** attempt) * (1 + random.random() * 0.1))
 
-    try:
-        r = requests.get(url, headers=HEADERS, params=params)
-        data = r.json().get("response", [])
-    except Exception as e:
-        print(f"Error fetching injuries for {team_id}: {e}")
-        return []
 
+async def aclose():
+    """Closes the pooled async client (call on app shutdown)."""
+    global _async_client
+    # A client from another (finished) loop can't be closed here; just drop it
+    if _async_client is not None and _async_client_loop is asyncio.get_running_loop():
+        await _async_client.aclose()
+    _async_client = None
+
+
+# ---------------- PARSERS ----------------
+POS_MAP = {
+    "Goalkeeper": "GK",
+    "Defender": "DEF",
+    "Midfielder": "MID",
+    "Attacker": "ATT"
+}
+
+
+def _parse_injuries(data):
     injuries = []
     for i in data:
         fi = i["player"]
-        pos_map = {
-            "Goalkeeper": "GK",
-            "Defender": "DEF",
-            "Midfielder": "MID",
-            "Attacker": "ATT"
-        }
-        
-        position = pos_map.get(fi["type"], "MID")
-        
+        position = POS_MAP.get(fi["type"], "MID")
+
         # Deduplicate by checking if name already exists
         if any(inj["name"] == fi["name"] for inj in injuries):
             continue
@@ -47,25 +203,94 @@ def get_injuries(team_id, season=2024):
             "position": position,
             "impact": 5 # Default impact, user adjusts manually
         })
-    
+
     return injuries[:8] # Limit to 8 to avoid clutter
 
+
+def _parse_lineup(data_l):
+    if not data_l:
+        return []
+
+    # Parse startXI
+    lineup_raw = data_l[0]["startXI"]
+    lineup = []
+    for p in lineup_raw:
+         # Map 'G', 'D', 'M', 'F' to our format if needed, or keep as is
+         # Player dict: {player: {id, name, number, pos, grid}}
+         player_obj = p["player"]
+         lineup.append({
+             "id": str(player_obj["id"]),
+             "name": player_obj["name"],
+             "number": player_obj["number"],
+             "pos": player_obj["pos"] # usually "G", "D", "M", "F"
+         })
+
+    return lineup
+
+
+def _parse_squad(data):
+    if not data:
+        return []
+
+    players = data[0].get("players", [])
+    squad = []
+
+    for p in players:
+        # Map position to short format
+        position = POS_MAP.get(p.get("position"), "MID")
+
+        # Generate a rating (API doesn't provide, estimate based on age)
+        age = p.get("age", 25)
+        base_rating = 75
+        if age < 23:
+            rating = base_rating + (age - 18)  # Young talent: 75-80
+        elif age < 30:
+            rating = base_rating + 5 + (30 - age) // 2  # Prime: 78-85
+        else:
+            rating = base_rating + 3 - (age - 30)  # Veteran: 75-78
+        rating = max(65, min(95, rating))  # Clamp
+
+        squad.append({
+            "id": p.get("id"),
+            "name": p.get("name"),
+            "age": p.get("age"),
+            "number": p.get("number"),
+            "position": position,
+            "photo": p.get("photo"),
+            "rating": rating
+        })
+
+    return squad
+
+
+# ---------------- SYNC API ----------------
+def get_injuries(team_id, season=2024):
+    if not API_KEY:
+        print("Warning: No API Key found.")
+        return []
+
+    try:
+        data = _get("/injuries", {"team": team_id, "season": season})
+    except Exception as e:
+        print(f"Error fetching injuries for {team_id}: {e}")
+        return []
+
+    return _parse_injuries(data)
+
 def get_last_match_date(team_id, season=2024):
     if not API_KEY:
         return None
 
-    url = f"{BASE_URL}/fixtures"
     # Fetch last 1 match that is finished
     params = {
-        "team": team_id, 
-        "last": 1, 
+        "team": team_id,
+        "last": 1,
         "status": "FT",
         "season": season
     }
 
     try:
-        r = requests.get(url, headers=HEADERS, params=params)
-        data = r.json().get("response", [])
+        data = _get("/fixtures", params)
         if data:
             # Format: 2024-04-20T14:00:00+00:00
             return data[0]["fixture"]["date"]
@@ -81,15 +306,11 @@ def role_counts(injuries):
     return roles
 
 def search_team_id(team_name):
-    if not API_KEY: 
+    if not API_KEY:
         return None
-    
-    url = f"{BASE_URL}/teams"
-    params = {"search": team_name}
-    
+
     try:
-        r = requests.get(url, headers=HEADERS, params=params)
-        data = r.json().get("response", [])
+        data = _get("/teams", {"search": team_name})
         if data:
             return data[0]["team"]["id"]
     except Exception as e:
@@ -100,47 +321,16 @@ def get_lineup(team_id, season=2024):
     if not API_KEY:
         return []
 
-    # 1. Get last match (proxy for current form/lineup)
-    url_fixtures = f"{BASE_URL}/fixtures"
-    params_fixtures = {
-        "team": team_id,
-        "last": 1,
-        "season": season
-    }
-    
     try:
-        r = requests.get(url_fixtures, headers=HEADERS, params=params_fixtures)
-        data = r.json().get("response", [])
+        # 1. Get last match (proxy for current form/lineup)
+        data = _get("/fixtures", {"team": team_id, "last": 1, "season": season})
         if not data:
             return []
-        
+
         fixture_id = data[0]["fixture"]["id"]
-        
-        # 2. Get Lineup for that fixture
-        url_lineup = f"{BASE_URL}/fixtures/lineups"
-        params_lineup = {"fixture": fixture_id, "team": team_id}
-        
-        r_l = requests.get(url_lineup, headers=HEADERS, params=params_lineup)
-        data_l = r_l.json().get("response", [])
-        
-        if not data_l:
-            return []
 
-        # Parse startXI
-        lineup_raw = data_l[0]["startXI"]
-        lineup = []
-        for p in lineup_raw:
-             # Map 'G', 'D', 'M', 'F' to our format if needed, or keep as is
-             # Player dict: {player: {id, name, number, pos, grid}}
-             player_obj = p["player"]
-             lineup.append({
-                 "id": str(player_obj["id"]),
-                 "name": player_obj["name"],
-                 "number": player_obj["number"],
-                 "pos": player_obj["pos"] # usually "G", "D", "M", "F"
-             })
-             
-        return lineup
+        # 2. Get Lineup for that fixture
+        return _parse_lineup(_get("/fixtures/lineups", {"fixture": fixture_id, "team": team_id}))
 
     except Exception as e:
         print(f"Lineup fetch error for {team_id}: {e}")
@@ -150,53 +340,77 @@ def get_squad(team_id):
     """Fetch full squad roster with player photos and details"""
     if not API_KEY:
         return []
-    
-    url = f"{BASE_URL}/players/squads"
-    params = {"team": team_id}
-    
+
+    try:
+        return _parse_squad(_get("/players/squads", {"team": team_id}))
+    except Exception as e:
+        print(f"Squad fetch error for {team_id}: {e}")
+        return []
+
+
+# ---------------- ASYNC API ----------------
+# Same contracts as the sync functions, over the pooled async client.
+async def get_injuries_async(team_id, season=2024):
+    if not API_KEY:
+        print("Warning: No API Key found.")
+        return []
+
+    try:
+        data = await _aget("/injuries", {"team": team_id, "season": season})
+    except Exception as e:
+        print(f"Error fetching injuries for {team_id}: {e}")
+        return []
+
+    return _parse_injuries(data)
+
+async def get_last_match_date_async(team_id, season=2024):
+    if not API_KEY:
+        return None
+
+    params = {"team": team_id, "last": 1, "status": "FT", "season": season}
+    try:
+        data = await _aget("/fixtures", params)
+        if data:
+            return data[0]["fixture"]["date"]
+    except Exception as e:
+        print(f"Error fetching fixtures for {team_id}: {e}")
+    return None
+
+async def search_team_id_async(team_name, raise_errors=False):
+    # raise_errors=True lets callers tell "not found" (None) from a failed request
+    if not API_KEY:
+        return None
+
+    try:
+        data = await _aget("/teams", {"search": team_name})
+        if data:
+            return data[0]["team"]["id"]
+    except Exception as e:
+        if raise_errors:
+            raise
+        print(f"Search error for {team_name}: {e}")
+    return None
+
+async def get_lineup_async(team_id, season=2024):
+    if not API_KEY:
+        return []
+
     try:
-        r = requests.get(url, headers=HEADERS, params=params)
-        data = r.json().get("response", [])
-        
+        data = await _aget("/fixtures", {"team": team_id, "last": 1, "season": season})
         if not data:
             return []
-        
-        players = data[0].get("players", [])
-        squad = []
-        
-        for p in players:
-            # Map position to short format
-            pos_map = {
-                "Goalkeeper": "GK",
-                "Defender": "DEF", 
-                "Midfielder": "MID",
-                "Attacker": "ATT"
-            }
-            position = pos_map.get(p.get("position"), "MID")
-            
-            # Generate a rating (API doesn't provide, estimate based on age)
-            age = p.get("age", 25)
-            base_rating = 75
-            if age < 23:
-                rating = base_rating + (age - 18)  # Young talent: 75-80
-            elif age < 30:
-                rating = base_rating + 5 + (30 - age) // 2  # Prime: 78-85
-            else:
-                rating = base_rating + 3 - (age - 30)  # Veteran: 75-78
-            rating = max(65, min(95, rating))  # Clamp
-            
-            squad.append({
-                "id": p.get("id"),
-                "name": p.get("name"),
-                "age": p.get("age"),
-                "number": p.get("number"),
-                "position": position,
-                "photo": p.get("photo"),
-                "rating": rating
-            })
-        
-        return squad
-        
+        fixture_id = data[0]["fixture"]["id"]
+        return _parse_lineup(await _aget("/fixtures/lineups", {"fixture": fixture_id, "team": team_id}))
+    except Exception as e:
+        print(f"Lineup fetch error for {team_id}: {e}")
+        return []
+
+async def get_squad_async(team_id):
+    if not API_KEY:
+        return []
+
+    try:
+        return _parse_squad(await _aget("/players/squads", {"team": team_id}))
     except Exception as e:
         print(f"Squad fetch error for {team_id}: {e}")
-        return []
\ No newline at end of file
+        return []
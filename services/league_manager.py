@@ -1,103 +1,454 @@
+import numpy as np
 import pandas as pd
+import multiprocessing
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import MappingProxyType
 from models.elo_engine import EloEngine
+from models.form import FeatureStore, rolling_form, last_per_group
 from models.predictor import MatchPredictor
+from models.season_sim import simulate_season
+from services import match_cache, metrics, schemas, snapshot
+
+# Rolling window lengths used for form stats
+PTS_WINDOW = 5
+GOALS_WINDOW = 10
+# Optional exponentially weighted form features (spans) kept in the feature store
+FORM_EWM_SPANS = ()
+
+# All-pairs default probabilities are only precomputed up to this many teams (N x N)
+MAX_MATRIX_TEAMS = 500
+
+# Season simulation limits
+MAX_SIM_FIXTURES = 5000
+
+# Seconds between checks for a newer snapshot generation published by another worker
+REFRESH_INTERVAL = 1.0
+
+# Seconds between source file checks by the watcher; a changed file must also stay
+# unchanged for one more interval (not mid-copy) before its league is rebuilt
+WATCH_INTERVAL = 5.0
+
+# One row of the power table as a plain immutable record (ctx["team_index"][team])
+TeamRecord = namedtuple("TeamRecord", ["team", "rank", "power_score", "elo", "gf_last10", "ga_last10", "pts_last5"])
 
 class LeagueManager:
-    def __init__(self):
+    def __init__(self, cache_dir=None, use_cache=True):
         self.leagues = {} # { "PL": { "predictor": ..., "power_table": ... } }
+        # Normalized match cache (defaults to <csv dir>/.cache)
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        # Registered sources for background / on-demand loading
+        self.sources = {} # { "PL": Path(...) }
+        self._futures = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        # Serializes appends when there is no snapshot build lock to hold
+        self._append_lock = threading.Lock()
+        # Generation bookkeeping: local counter when not caching, last pointer check per league
+        self._generation = 0
+        self._checked = {}
+        # Called as fn(league_code, ctx) after a new context is swapped in
+        self._swap_listeners = []
+        self._watcher = None
+        self._watch_stop = threading.Event()
+
+    # ---------------- BACKGROUND LOADING ----------------
+    def register_league(self, league_code, csv_path):
+        self.sources[league_code] = Path(csv_path)
+
+    def start_loading(self, max_workers=None):
+        """Starts loading every registered league on a thread pool (non-blocking)."""
+        for code in self.sources:
+            self._submit(code, max_workers)
 
-    def load_league(self, league_code, csv_path):
+    def _submit(self, league_code, max_workers=None):
+        with self._lock:
+            fut = self._futures.get(league_code)
+            if fut is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=max_workers or max(1, len(self.sources)),
+                        thread_name_prefix="league-load",
+                    )
+                fut = self._executor.submit(self.load_league, league_code, self.sources[league_code])
+                self._futures[league_code] = fut
+            return fut
+
+    def league_status(self):
+        """{ code: "ready" | "loading" | "failed" | "pending" } for registered and loaded leagues."""
+        status = {}
+        for code in list(self.sources) + [c for c in self.leagues if c not in self.sources]:
+            fut = self._futures.get(code)
+            if code in self.leagues:
+                status[code] = "ready"
+            elif fut is None:
+                status[code] = "pending"
+            elif not fut.done():
+                status[code] = "loading"
+            else:
+                status[code] = "failed"
+        return status
+
+    def load_league(self, league_code, csv_path, rebuild_cache=False):
         print(f"Loading League: {league_code} from {csv_path}...")
         path = Path(csv_path)
         if not path.exists():
             print(f"⚠️ CSV NOT FOUND: {csv_path} (Skipping)")
             return
+        with metrics.span(league_code, "total"):
+            return self._load_league(league_code, path, rebuild_cache)
+
+    def _load_league(self, league_code, path, rebuild_cache=False):
+        if not self.use_cache:
+            return self._build_league(league_code, path, rebuild_cache)
 
+        # One worker builds, the rest wait on the lock and then map its snapshot
         try:
-            df = pd.read_csv(path, encoding='latin1') # Handle potential encoding issues
-        except Exception as e:
-            print(f"Error reading CSV {path}: {e}")
-            return
+            with snapshot.build_lock(league_code, path, self.cache_dir):
+                # Warm start: fully built context from the on-disk snapshot
+                if not rebuild_cache:
+                    ctx = self._load_snapshot(league_code, path)
+                    if ctx is not None:
+                        self._publish(league_code, ctx)
+                        print(f"✅ League {league_code} loaded from snapshot (generation {ctx['generation']}). {len(ctx['power_lookup'])} teams.")
+                        return
+                self._build_league(league_code, path, rebuild_cache)
+        except snapshot.LockTimeout:
+            # Another worker is still building: never build alongside it, serve
+            # whatever it (or an earlier build) last published for this source
+            ctx = self._load_snapshot(league_code, path)
+            if ctx is None:
+                raise
+            self._publish(league_code, ctx)
+            print(f"⚠️ League {league_code}: build lock busy, serving published snapshot (generation {ctx['generation']}).")
 
-        # ---------------- COLUMN MAPPING ----------------
-        # Standardize columns to: date, home, away, home_goals, away_goals
-        rename_map = {}
-        
-        # 1. Check for standard Football-Data.co.uk format (HomeTeam, FTHG...)
-        if "HomeTeam" in df.columns:
-            rename_map = {
-                "Date": "date",
-                "HomeTeam": "home",
-                "AwayTeam": "away",
-                "FTHG": "home_goals",
-                "FTAG": "away_goals"
-            }
-        
-        # 2. Check for International Matches format (Home Team, Home Goals...)
-        elif "Home Team" in df.columns:
-            rename_map = {
-                "Date": "date",
-                "Home Team": "home",
-                "Away Team": "away",
-                "Home Goals": "home_goals",
-                "Away Goals": "away_goals"
-            }
-        
-        df = df.rename(columns=rename_map)
-        
-        # Validate required columns exist
-        required = ["date", "home", "away", "home_goals", "away_goals"]
-        if not all(c in df.columns for c in required):
-            print(f"⚠️ Missing columns in {csv_path}. Found: {df.columns.tolist()}")
+    def _build_league(self, league_code, path, rebuild_cache=False):
+        # Stage timings go to metrics (ballknowledge_load_stage_seconds)
+        with metrics.span(league_code, "read"):
+            df = self._read_matches(path, rebuild_cache)
+        if df is None:
             return
 
-        # ---------------- DATE PARSING ----------------
-        # Try parse with dayfirst=True (handles YYYY-MM-DD and DD/MM/YYYY correctly usually)
-        try:
-            # Save original for debugging/fallback if needed (though we already renamed)
-            # Use 'mixed' format if available in pandas version, else fallback
-            try:
-                df["date"] = pd.to_datetime(df["date"], dayfirst=True, format="mixed", errors='coerce')
-            except ValueError:
-                # Fallback for older pandas
-                df["date"] = pd.to_datetime(df["date"], dayfirst=True, errors='coerce')
-                
-        except Exception as e:
-             print(f"Date parsing error: {e}")
-        
-        df = df.dropna(subset=["date"])
-        df = df.sort_values("date").reset_index(drop=True)
-
         if df.empty:
             print(f"⚠️ League {league_code} has no valid data after processing (Check Date formats).")
             return
 
+        # 1. Elo Engine
+        # Array-backed replay, so the full history (incl. 1900s internationals) is cheap
+        elo = EloEngine()
+        with metrics.span(league_code, "elo_replay"):
+            elo.compute_season(df)
+
+        # Point-in-time form for every match (full history, like Elo)
+        features = self._new_feature_store()
+        with metrics.span(league_code, "features"):
+            features.append_matches(df)
+
         # ---------------- FILTERING ----------------
-        # For World Cup / International, filter to recent history (e.g., post-2020)
-        # otherwise Elo calculation takes too long and includes 1900s data.
+        # For World Cup / International, keep form stats (and so the power table)
+        # to recent history (e.g., post-2020) so defunct teams don't show up.
         if league_code == "WC":
              df = df[df["date"].dt.year >= 2020].reset_index(drop=True)
 
-        # 1. Elo Engine
-        elo = EloEngine()
-        elo.compute_season(df)
-        
-        # Ensure DataFrame has columns even if empty
-        data_list = [{"team": t, "elo": v} for t, v in elo.team_elos.items()]
-        elo_df = pd.DataFrame(data_list, columns=["team", "elo"])
-
         # 2. Rolling Stats & Power Table
         # (Re-using logic from original api.py, encapsulated here)
-        final_stats = self._compute_stats(df)
-        
+        with metrics.span(league_code, "compute_stats"):
+            final_stats = self._compute_stats(df)
+
         if final_stats.empty:
              print(f"⚠️ League {league_code}: Could not compute stats (Not enough matches?).")
              return
 
+        # Per-team rolling windows so append_results can continue the form stats
+        with metrics.span(league_code, "form_windows"):
+            form = self._build_form_windows(df)
+        with metrics.span(league_code, "standings"):
+            standings = self._build_standings(df)
+
+        ctx = self._build_context(league_code, elo, final_stats, form, standings, df["date"].max())
+        ctx["features"] = features
+        ctx["source"] = path
+        self._publish(league_code, self._save_snapshot(league_code, ctx))
+        print(f"✅ League {league_code} loaded. {len(ctx['power_lookup'])} teams.")
+
+    # ---------------- SOURCE WATCHER ----------------
+    def watch_sources(self, interval=WATCH_INTERVAL, in_process=False):
+        """
+        Starts a daemon thread that rebuilds a league when its source file changes.
+        Requests keep the current context until the new one is swapped in.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return self._watcher
+        self._watch_stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch_loop, args=(interval, in_process), name="league-watch", daemon=True
+        )
+        self._watcher.start()
+        return self._watcher
+
+    def stop_watching(self, timeout=None):
+        self._watch_stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout)
+            self._watcher = None
+
+    def _watch_loop(self, interval, in_process):
+        seen = {code: _file_state(path) for code, path in self.sources.items()}
+        pending = {}
+        while not self._watch_stop.wait(interval):
+            for code, path in list(self.sources.items()):
+                state = _file_state(path)
+                if state == seen.get(code):
+                    pending.pop(code, None)
+                    continue
+                if pending.get(code) != state:
+                    pending[code] = state  # still being written? look again next interval
+                    continue
+                pending.pop(code)
+                seen[code] = state
+                if state is None:
+                    print(f"⚠️ Source for {code} removed; keeping the loaded league.")
+                    continue
+                print(f"Source for {code} changed, rebuilding...")
+                try:
+                    self.reload_league(code, in_process)
+                except Exception as e:
+                    print(f"⚠️ Reload of {code} failed, keeping generation {self.leagues.get(code, {}).get('generation')}: {e}")
+
+    def reload_league(self, league_code, in_process=False):
+        """
+        Rebuilds a registered league from its source and swaps it in. With the
+        snapshot cache on, the build runs in a child process (no GIL contention
+        with requests) and this process only maps the snapshot it publishes.
+        """
+        path = self.sources[league_code]
+        with metrics.span(league_code, "reload"):
+            if self.use_cache and not in_process:
+                proc = multiprocessing.get_context("spawn").Process(
+                    target=_build_in_child, args=(league_code, path, self.cache_dir),
+                    name=f"league-build-{league_code}",
+                )
+                proc.start()
+                proc.join()
+                ctx = self._load_snapshot(league_code, path) if proc.exitcode == 0 else None
+                if ctx is not None:
+                    self._publish(league_code, ctx)
+                    print(f"✅ League {league_code} reloaded (generation {ctx['generation']}).")
+                    return ctx
+                print(f"⚠️ Child build for {league_code} failed (exit code {proc.exitcode}); building in-process.")
+            self.load_league(league_code, path)
+        return self.leagues.get(league_code)
+
+    # ---------------- SNAPSHOTS ----------------
+    def _snapshot_params(self):
+        # Anything that changes the built context; a mismatch forces a rebuild
+        return {
+            "pts_window": PTS_WINDOW, "goals_window": GOALS_WINDOW,
+            "ewm_spans": list(FORM_EWM_SPANS), "max_matrix_teams": MAX_MATRIX_TEAMS,
+        }
+
+    def _new_feature_store(self):
+        return FeatureStore(PTS_WINDOW, GOALS_WINDOW, FORM_EWM_SPANS)
+
+    def _load_snapshot(self, league_code, path):
+        try:
+            with metrics.span(league_code, "snapshot_load"):
+                parts = snapshot.load_snapshot(league_code, path, self.cache_dir, self._snapshot_params())
+        except Exception as e:
+            print(f"Could not read snapshot for {league_code}: {e}")
+            return None
+        if parts is None:
+            return None
+        ctx = self._assemble_context(
+            league_code, parts["elo"], parts["power_table"], parts["final_stats"], parts["form"],
+            parts["standings"], parts["last_date"], parts["prob_matrix"],
+        )
+        ctx["features"] = parts["features"]
+        ctx["source"] = path
+        ctx["generation"] = parts["generation"]
+        return ctx
+
+    def _save_snapshot(self, league_code, ctx):
+        # Publishes ctx as the next on-disk generation (shared by every worker)
+        if self.use_cache and ctx.get("source") is not None:
+            try:
+                with metrics.span(league_code, "snapshot_save"):
+                    ctx["generation"] = snapshot.save_snapshot(
+                        ctx, league_code, ctx["source"], self.cache_dir, self._snapshot_params()
+                    )
+            except Exception as e:
+                print(f"Could not write snapshot for {league_code}: {e}")
+        return ctx
+
+    def add_swap_listener(self, fn):
+        """fn(league_code, ctx) runs after every swap (load, append, refresh) of a league."""
+        self._swap_listeners.append(fn)
+
+    def _publish(self, league_code, ctx):
+        # A new build replaces the old context in a single assignment
+        with self._lock:
+            if "generation" not in ctx:
+                prev = self.leagues.get(league_code)
+                self._generation = max(self._generation, prev["generation"] if prev else 0) + 1
+                ctx["generation"] = self._generation
+            self._checked[league_code] = time.monotonic()
+            self.leagues[league_code] = ctx
+        for fn in self._swap_listeners:
+            try:
+                fn(league_code, ctx)
+            except Exception as e:
+                print(f"Swap listener error for {league_code}: {e}")
+
+    def _maybe_refresh(self, league_code, ctx):
+        """
+        Swaps in a newer generation published by another worker. Checked at most
+        every REFRESH_INTERVAL seconds per league (one small file read).
+        """
+        path = ctx.get("source")
+        if not self.use_cache or path is None:
+            return ctx
+        now = time.monotonic()
+        if now - self._checked.get(league_code, 0) < REFRESH_INTERVAL:
+            return ctx
+        self._checked[league_code] = now
+        if snapshot.current_generation(league_code, path, self.cache_dir) <= ctx.get("generation", 0):
+            return ctx
+
+        fresh = self._load_snapshot(league_code, path)
+        if fresh is None or fresh["generation"] <= ctx.get("generation", 0):
+            return ctx
+        self._publish(league_code, fresh)
+        print(f"✅ League {league_code} refreshed to generation {fresh['generation']}.")
+        return fresh
+
+    def append_results(self, league_code, new_matches):
+        """
+        Applies new results (DataFrame or list of dicts) on top of a loaded league.
+        Elo continues from the current ratings and only the touched teams' form
+        windows are updated; the power table is re-normalized and the league
+        context replaced with a new one. Raises ValueError for results dated
+        before the league's last match.
+        """
+        ctx = self.get_league(league_code)
+        if not ctx:
+            print(f"⚠️ League {league_code} not loaded. Call load_league first.")
+            return
+
+        df = self._prepare_matches(pd.DataFrame(new_matches), f"{league_code} update")
+        if df is None or df.empty:
+            print(f"⚠️ League {league_code}: no valid matches to append.")
+            return
+
+        # Held from picking the base context to publishing the next generation, so
+        # concurrent appends (threads or workers) neither reuse a generation
+        # number nor drop each other's results
+        path = ctx.get("source")
+        if self.use_cache and path is not None:
+            lock = snapshot.build_lock(league_code, path, self.cache_dir)
+        else:
+            lock = self._append_lock
+        with lock:
+            ctx = self._latest(league_code)
+            new_ctx = self._append(league_code, ctx, df)
+        print(f"✅ League {league_code} updated with {len(df)} matches (generation {new_ctx['generation']}).")
+
+    def _latest(self, league_code):
+        # Newest context, checking the on-disk pointer now rather than every REFRESH_INTERVAL
+        self._checked.pop(league_code, None)
+        return self._maybe_refresh(league_code, self.leagues[league_code])
+
+    def _append(self, league_code, ctx, df):
+        # Rating history and features are searched by (team, day) in replay order, so
+        # a back-dated row would silently corrupt as-of lookups; those need a rebuild
+        if df["date"].min() < ctx["last_date"]:
+            raise ValueError(
+                f"League {league_code}: matches dated before {ctx['last_date']:%Y-%m-%d} can't be appended; "
+                f"add them to the source CSV and reload the league."
+            )
+
+        # Copy-on-write: the published context (engine, features, form, standings)
+        # is never touched, so in-flight requests keep a consistent view
+        # 1. Elo continues from where the last replay stopped
+        elo = ctx["predictor"].elo_engine.copy()
+        elo.compute_season(df)
+        features = ctx["features"].copy()
+        features.append_matches(df)
+
+        # 2. Form windows: O(new matches)
+        form = self._copy_form(ctx["form"])
+        for date, home, away, hg, ag in zip(
+            df["date"], df["home"], df["away"], df["home_goals"], df["away_goals"]
+        ):
+            self._push_result(form, home, date, hg, ag)
+            self._push_result(form, away, date, ag, hg)
+
+        final_stats = self._form_to_stats(form)
+
+        standings = self._copy_standings(ctx["standings"])
+        self._update_standings(standings, df)
+
+        new_ctx = self._build_context(
+            league_code,
+            elo, final_stats, form, standings, max(ctx["last_date"], df["date"].max())
+        )
+        new_ctx["features"] = features
+        new_ctx["source"] = ctx.get("source")
+        self._publish(league_code, self._save_snapshot(league_code, new_ctx))
+        return new_ctx
+
+    def _read_matches(self, path, rebuild_cache=False):
+        # Warm path: normalized columns straight from the binary cache
+        if self.use_cache and not rebuild_cache:
+            df = match_cache.load_matches(path, self.cache_dir)
+            if df is not None:
+                return df
+
+        # Column-projected read with fixed dtypes / date format per source schema
+        try:
+            df, schema_name = schemas.read_matches(path)
+        except Exception as e:
+            print(f"Error reading CSV {path}: {e}")
+            return None
+
+        if df is None:
+            print(f"⚠️ Unknown CSV layout in {path}. Known: {list(schemas.SOURCE_SCHEMAS)}")
+            return None
+
+        if self.use_cache:
+            try:
+                match_cache.save_matches(df, path, self.cache_dir)
+            except Exception as e:
+                print(f"Could not write cache for {path}: {e}")
+        return df
+
+    def _prepare_matches(self, df, source):
+        # Standardize an in-memory frame (any registered layout) to:
+        # date, home, away, home_goals, away_goals
+        schema_name = schemas.detect_schema(df.columns)
+        if schema_name is None:
+            print(f"⚠️ Missing columns in {source}. Found: {df.columns.tolist()}")
+            return None
+
+        df = schemas.normalize(df, schema_name)
+        return df.sort_values("date", kind="stable").reset_index(drop=True)
+
+    def _build_context(self, league_code, elo, final_stats, form, standings, last_date):
+        with metrics.span(league_code, "power_table"):
+            power_table = self._power_table(elo, final_stats)
+        return self._assemble_context(league_code, elo, power_table, final_stats, form, standings, last_date)
+
+    def _power_table(self, elo, final_stats):
+        # Ensure DataFrame has columns even if empty
+        data_list = [{"team": t, "elo": v} for t, v in elo.team_elos.items()]
+        elo_df = pd.DataFrame(data_list, columns=["team", "elo"])
+
         # Merge
         tf = final_stats.merge(elo_df, on="team", how="left")
-        
+
         # Power Score Calculation
         tf["defence_strength"] = -tf["ga_last10"]
         tf["attack_strength"] = tf["gf_last10"]
@@ -124,51 +475,282 @@ class LeagueManager:
         else:
             tf["power_score"] = 100 * (tf["raw_power"] - mn) / (mx - mn)
 
-        power_table = tf[["team", "power_score", "elo", "gf_last10", "ga_last10", "pts_last5"]].sort_values("power_score", ascending=False)
+        return tf[["team", "power_score", "elo", "gf_last10", "ga_last10", "pts_last5"]].sort_values("power_score", ascending=False)
+
+    def _assemble_context(self, league_code, elo, power_table, final_stats, form, standings, last_date, prob_matrix=None):
+        # Ensure DataFrame has columns even if empty
+        elo_df = pd.DataFrame(list(elo.team_elos.items()), columns=["team", "elo"])
         power_lookup = dict(zip(power_table["team"], power_table["power_score"]))
+        team_index = self._build_team_index(power_table)
 
         # 3. Predictor
         predictor = MatchPredictor(elo, power_lookup)
 
-        self.leagues[league_code] = {
+        # 4. Default-input probabilities for every ordered fixture, built with the
+        # snapshot so it is swapped in together with it
+        if prob_matrix is None:
+            with metrics.span(league_code, "prob_matrix"):
+                prob_matrix = self._build_prob_matrix(predictor, sorted(power_lookup))
+
+        return {
             "predictor": predictor,
             "power_table": power_table,
             "power_lookup": power_lookup,
+            "team_index": team_index,
+            "team_names": tuple(sorted(team_index)),
+            "prob_matrix": prob_matrix,
             "elo_df": elo_df,
-            "final_stats": final_stats
+            "final_stats": final_stats,
+            "form": form,
+            "standings": standings,
+            "last_date": last_date
         }
-        print(f"✅ League {league_code} loaded. {len(power_lookup)} teams.")
 
-    def _compute_stats(self, df):
-        # Helper to compute rolling stats (moved from api.py)
-        # Prepare home/away frames
+    def _build_team_index(self, power_table):
+        # Built once per context so routes do a dict lookup instead of pandas scans/merges
+        columns = [power_table[c].tolist() for c in ["team", "power_score", "elo", "gf_last10", "ga_last10", "pts_last5"]]
+        return MappingProxyType({
+            row[0]: TeamRecord(row[0], rank, *row[1:])
+            for rank, row in enumerate(zip(*columns), start=1)
+        })
+
+    def _build_prob_matrix(self, predictor, teams):
+        # { "teams", "index", "home_win"/"draw"/"away_win"/"elo_diff"/"power_diff": N x N }
+        # Row = home team, column = away team. No injuries, 7 rest days each side.
+        n = len(teams)
+        if n == 0 or n > MAX_MATRIX_TEAMS:
+            return None
+
+        homes = np.repeat(teams, n)
+        aways = np.tile(teams, n)
+        res = predictor.predict_many(homes, aways)
+
+        matrix = {"teams": teams, "index": {t: i for i, t in enumerate(teams)}}
+        for key in ["home_win", "draw", "away_win", "elo_diff", "power_diff"]:
+            arr = np.ascontiguousarray(res[key], dtype=np.float64).reshape(n, n)
+            arr.flags.writeable = False
+            matrix[key] = arr
+        return matrix
+
+    def default_prediction(self, league_code, home, away, ctx=None):
+        """
+        predict_match(home, away) result with default inputs from the precomputed
+        matrix, or None if the league/teams aren't covered. Pass the context a
+        caller already holds so the answer can't come from a newer generation.
+        """
+        if ctx is None:
+            ctx = self.get_league(league_code)
+        matrix = ctx.get("prob_matrix") if ctx else None
+        if matrix is None:
+            return None
+        i = matrix["index"].get(home)
+        j = matrix["index"].get(away)
+        if i is None or j is None:
+            return None
+        return {
+            "home": home,
+            "away": away,
+            "home_win": float(matrix["home_win"][i, j]),
+            "draw": float(matrix["draw"][i, j]),
+            "away_win": float(matrix["away_win"][i, j]),
+            "elo_diff": float(matrix["elo_diff"][i, j]),
+            "power_diff": float(matrix["power_diff"][i, j]),
+            "home_penalty": 0.0,
+            "away_penalty": 0.0,
+            "home_fatigue": 0.0,
+            "away_fatigue": 0.0
+        }
+
+    def _compute_stats(self, df, ewm_spans=()):
+        # Latest rolling form per team: one row per team, ordered by last match date
+        team_matches = self._team_matches(df)
+        form = rolling_form(
+            team_matches["team"].to_numpy(), team_matches["date"].to_numpy(),
+            team_matches["goals_for"].to_numpy(), team_matches["goals_against"].to_numpy(),
+            PTS_WINDOW, GOALS_WINDOW, ewm_spans,
+        )
+
+        last = last_per_group(form["team"])
+        last = last[np.argsort(form["date"][last], kind="stable")]
+
+        stats = {
+            "team": form["team"][last],
+            "pts_last5": form[f"pts_last{PTS_WINDOW}"][last],
+            "gf_last10": form[f"gf_last{GOALS_WINDOW}"][last],
+            "ga_last10": form[f"ga_last{GOALS_WINDOW}"][last],
+        }
+        for c in ("pts", "gf", "ga"):
+            for span in ewm_spans:
+                stats[f"{c}_ewm{span}"] = form[f"{c}_ewm{span}"][last]
+        return pd.DataFrame(stats)
+
+    def _team_matches(self, df):
+        # Form only counts matches with a result (NaN goals are unplayed, as in the standings)
+        df = df[df["home_goals"].notna() & df["away_goals"].notna()]
         home_df = df[["date", "home", "home_goals", "away_goals"]].rename(
             columns={"home": "team", "home_goals": "goals_for", "away_goals": "goals_against"}
         )
         away_df = df[["date", "away", "home_goals", "away_goals"]].rename(
             columns={"away": "team", "away_goals": "goals_for", "home_goals": "goals_against"}
         )
-        team_matches = pd.concat([home_df, away_df], ignore_index=True)
+        return pd.concat([home_df, away_df], ignore_index=True)
 
-        def result_points(row):
-            if row["goals_for"] > row["goals_against"]: return 3
-            elif row["goals_for"] < row["goals_against"]: return 0
-            return 1
+    # ---------------- FORM WINDOWS ----------------
+    # { team: {"last_date", "gf": deque, "ga": deque, "pts": deque} } holding the
+    # most recent GOALS_WINDOW / PTS_WINDOW values, oldest first.
+    def _build_form_windows(self, df):
+        tail = (
+            self._team_matches(df)
+            .sort_values(["team", "date"], kind="stable")
+            .groupby("team")
+            .tail(GOALS_WINDOW)
+        )
+        form = {}
+        for team, date, gf, ga in zip(tail["team"], tail["date"], tail["goals_for"], tail["goals_against"]):
+            self._push_result(form, team, date, gf, ga)
+        return form
 
-        team_matches["points"] = team_matches.apply(result_points, axis=1)
-        team_matches = team_matches.sort_values(["team", "date"]).reset_index(drop=True)
+    def _push_result(self, form, team, date, gf, ga):
+        if pd.isna(gf) or pd.isna(ga):
+            return
+        w = form.get(team)
+        if w is None:
+            w = form[team] = {
+                "last_date": date,
+                "gf": deque(maxlen=GOALS_WINDOW),
+                "ga": deque(maxlen=GOALS_WINDOW),
+                "pts": deque(maxlen=PTS_WINDOW),
+            }
+        w["last_date"] = date
+        w["gf"].append(gf)
+        w["ga"].append(ga)
+        w["pts"].append(3 if gf > ga else 0 if gf < ga else 1)
 
-        g = team_matches.groupby("team")
-        team_matches["pts_last5"] = g["points"].rolling(5, min_periods=1).mean().reset_index(level=0, drop=True)
-        team_matches["gf_last10"] = g["goals_for"].rolling(10, min_periods=1).mean().reset_index(level=0, drop=True)
-        team_matches["ga_last10"] = g["goals_against"].rolling(10, min_periods=1).mean().reset_index(level=0, drop=True)
+    def _copy_form(self, form):
+        return {
+            team: {
+                "last_date": w["last_date"],
+                "gf": deque(w["gf"], maxlen=GOALS_WINDOW),
+                "ga": deque(w["ga"], maxlen=GOALS_WINDOW),
+                "pts": deque(w["pts"], maxlen=PTS_WINDOW),
+            }
+            for team, w in form.items()
+        }
 
-        return (
-            team_matches.sort_values("date")
-            .groupby("team")
-            .tail(1)[["team", "pts_last5", "gf_last10", "ga_last10"]]
-            .reset_index(drop=True)
+    def _form_to_stats(self, form):
+        # Same layout as _compute_stats: one row per team, ordered by last match date
+        rows = sorted(form.items(), key=lambda kv: kv[1]["last_date"])
+        return pd.DataFrame(
+            [
+                {
+                    "team": team,
+                    "pts_last5": sum(w["pts"]) / len(w["pts"]),
+                    "gf_last10": sum(w["gf"]) / len(w["gf"]),
+                    "ga_last10": sum(w["ga"]) / len(w["ga"]),
+                }
+                for team, w in rows
+            ],
+            columns=["team", "pts_last5", "gf_last10", "ga_last10"],
+        )
+
+    # ---------------- STANDINGS ----------------
+    # { "table": { team: {"points", "gf", "ga", "played"} }, "played": {(home, away), ...} }
+    # from matches with a result in the loaded data (meant for single-season files).
+    def _build_standings(self, df):
+        standings = {"table": {}, "played": set()}
+        self._update_standings(standings, df)
+        return standings
+
+    def _copy_standings(self, standings):
+        return {
+            "table": {team: dict(row) for team, row in standings["table"].items()},
+            "played": set(standings["played"]),
+        }
+
+    def _update_standings(self, standings, df):
+        table = standings["table"]
+        for home, away, hg, ag in zip(df["home"], df["away"], df["home_goals"], df["away_goals"]):
+            for team in (home, away):
+                if team not in table:
+                    table[team] = {"points": 0, "gf": 0, "ga": 0, "played": 0}
+            if pd.isna(hg) or pd.isna(ag):
+                continue  # fixture without a result yet
+            standings["played"].add((home, away))
+            for team, gf, ga in ((home, hg, ag), (away, ag, hg)):
+                row = table[team]
+                row["points"] += 3 if gf > ga else 0 if gf < ga else 1
+                row["gf"] += gf
+                row["ga"] += ga
+                row["played"] += 1
+
+    def remaining_fixtures(self, league_code):
+        """Double round-robin (home, away) pairs not yet played in the loaded data."""
+        ctx = self.get_league(league_code)
+        if not ctx:
+            return []
+        teams = sorted(ctx["standings"]["table"])
+        played = ctx["standings"]["played"]
+        return [(h, a) for h in teams for a in teams if h != a and (h, a) not in played]
+
+    def simulate_season(self, league_code, fixtures=None, n_sims=10000, seed=None, workers=1):
+        """
+        Monte Carlo final-table probabilities from the current standings.
+        fixtures: remaining (home, away) pairs; derived with remaining_fixtures if None.
+        Returns the simulate_season result dict or None if the league isn't loaded.
+        """
+        ctx = self.get_league(league_code)
+        if not ctx:
+            return None
+        if fixtures is None:
+            fixtures = self.remaining_fixtures(league_code)
+        if len(fixtures) > MAX_SIM_FIXTURES:
+            raise ValueError(f"Too many fixtures to simulate ({len(fixtures)}), max is {MAX_SIM_FIXTURES}.")
+
+        table = ctx["standings"]["table"]
+        teams = sorted(set(table) | {t for f in fixtures for t in f})
+        index = {t: i for i, t in enumerate(teams)}
+        base_points = [table[t]["points"] if t in table else 0 for t in teams]
+        # Goal difference only breaks ties on points
+        tiebreak = [(table[t]["gf"] - table[t]["ga"]) * 1e-3 if t in table else 0 for t in teams]
+
+        homes = [h for h, _ in fixtures]
+        aways = [a for _, a in fixtures]
+        probs = ctx["predictor"].predict_many(homes, aways)
+
+        return simulate_season(
+            teams, base_points,
+            [index[h] for h in homes], [index[a] for a in aways],
+            probs["home_win"], probs["draw"],
+            n_sims=n_sims, seed=seed, workers=workers, tiebreak=tiebreak,
         )
 
-    def get_league(self, code):
+    def get_league(self, code, wait=True, timeout=None):
+        """
+        League context, or None. A registered league that isn't built yet is
+        loaded on demand (or its in-progress load awaited) unless wait=False.
+        """
+        ctx = self.leagues.get(code)
+        if ctx is not None:
+            return self._maybe_refresh(code, ctx)
+        if not wait or code not in self.sources:
+            return ctx
+        try:
+            self._submit(code).result(timeout)
+        except Exception as e:
+            print(f"Error loading league {code}: {e}")
         return self.leagues.get(code)
+
+
+def _file_state(path):
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+def _build_in_child(league_code, path, cache_dir):
+    # Runs in a spawned process: build (or reuse) and publish the snapshot, nothing else
+    manager = LeagueManager(cache_dir=cache_dir)
+    manager.load_league(league_code, path)
+    raise SystemExit(0 if league_code in manager.leagues else 1)
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Bump when the cached layout changes so old files are rebuilt
+CACHE_VERSION = 2
+
+
+def file_fingerprint(path):
+    path = Path(path)
+    st = path.stat()
+    return {
+        "path": str(path.resolve()),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+    }
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_path(csv_path, cache_dir=None):
+    csv_path = Path(csv_path)
+    cache_dir = Path(cache_dir) if cache_dir else csv_path.parent / ".cache"
+    return cache_dir / f"{csv_path.stem}.matches.npz"
+
+
+def _read_meta(npz_path):
+    with np.load(npz_path, allow_pickle=False) as z:
+        return json.loads(str(z["meta"]))
+
+
+def is_fresh(csv_path, cache_dir=None):
+    """True if the cache for csv_path matches the current file."""
+    npz_path = cache_path(csv_path, cache_dir)
+    if not npz_path.exists():
+        return False
+    try:
+        meta = _read_meta(npz_path)
+    except Exception:
+        return False
+
+    if meta.get("version") != CACHE_VERSION:
+        return False
+    return fingerprint_matches(meta, csv_path)
+
+
+def source_fingerprint(csv_path):
+    # Full fingerprint (incl. content hash) to store alongside derived data
+    meta = file_fingerprint(csv_path)
+    meta["sha1"] = file_hash(csv_path)
+    return meta
+
+
+def fingerprint_matches(meta, csv_path):
+    """
+    True if a stored source_fingerprint still describes csv_path.
+    Size + mtime is the fast path; if those moved, the content hash decides.
+    """
+    fp = file_fingerprint(csv_path)
+    if meta.get("path") != fp["path"]:
+        return False
+    if meta.get("size") == fp["size"] and meta.get("mtime_ns") == fp["mtime_ns"]:
+        return True
+    # e.g. file touched/copied but unchanged
+    return meta.get("size") == fp["size"] and meta.get("sha1") == file_hash(csv_path)
+
+
+def load_matches(csv_path, cache_dir=None):
+    """Normalized match frame from the cache, or None if missing/stale."""
+    if not is_fresh(csv_path, cache_dir):
+        return None
+    npz_path = cache_path(csv_path, cache_dir)
+    try:
+        with np.load(npz_path, allow_pickle=False) as z:
+            teams = z["teams"]
+            return pd.DataFrame({
+                "date": pd.to_datetime(z["date"]),
+                "home": pd.Categorical.from_codes(z["home_idx"], teams).astype(object),
+                "away": pd.Categorical.from_codes(z["away_idx"], teams).astype(object),
+                "home_goals": z["home_goals"],
+                "away_goals": z["away_goals"],
+            })
+    except Exception as e:
+        print(f"Error reading cache {npz_path}: {e}")
+        return None
+
+
+def save_matches(df, csv_path, cache_dir=None):
+    """Writes the normalized columns of df as the cache for csv_path."""
+    npz_path = cache_path(csv_path, cache_dir)
+    npz_path.parent.mkdir(parents=True, exist_ok=True)
+
+    meta = source_fingerprint(csv_path)
+    meta["version"] = CACHE_VERSION
+
+    # Team names interned once; rows store int32 codes
+    codes, teams = pd.factorize(pd.concat([df["home"], df["away"]], ignore_index=True))
+    n = len(df)
+
+    tmp_path = npz_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            meta=np.array(json.dumps(meta)),
+            teams=np.asarray(teams, dtype=str),
+            date=df["date"].to_numpy(dtype="datetime64[ns]"),
+            home_idx=codes[:n].astype(np.int32),
+            away_idx=codes[n:].astype(np.int32),
+            home_goals=pd.to_numeric(df["home_goals"], errors="coerce").to_numpy(),
+            away_goals=pd.to_numeric(df["away_goals"], errors="coerce").to_numpy(),
+        )
+    os.replace(tmp_path, npz_path)
@@ -0,0 +1,170 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Minimal in-process metrics with Prometheus text exposition (no client library).
+# Recording is a lock, a bisect and two additions, so it is cheap enough for
+# every request.
+
+PREFIX = "ballknowledge_"
+
+# Seconds; covers sub-millisecond lookups up to multi-second league builds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = PREFIX + name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        for labels, (counts, total) in items:
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = _labels(self.labelnames, labels, ("le", _number(bound)))
+                lines.append(f"{self.name}_bucket{le} {running}")
+            base = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{base} {_number(total)}")
+            lines.append(f"{self.name}_count{base} {running}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn):
+        """
+        fn() -> iterable of (name, type, help, [(labels dict, value), ...]),
+        read at scrape time (for gauges such as cache sizes).
+        """
+        self._collectors.append(fn)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for fn in self._collectors:
+            try:
+                families = list(fn())
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+                continue
+            for name, kind, help, samples in families:
+                name = PREFIX + name
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ---------------- SHARED METRICS ----------------
+LOAD_STAGE_SECONDS = registry.histogram(
+    "load_stage_seconds", "League load stage duration (stage=\"total\" covers the whole load).", ["league", "stage"]
+)
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ["method", "route"]
+)
+REQUESTS = registry.counter(
+    "http_requests_total", "Requests by route template and status code.", ["method", "route", "status"]
+)
+DATE_PARSE_SECONDS = registry.histogram(
+    "date_parse_seconds", "Date column parsing per normalized frame/chunk.", ["schema"]
+)
+UPSTREAM_SECONDS = registry.histogram(
+    "upstream_request_duration_seconds", "API-Football call latency (each attempt).", ["path"]
+)
+UPSTREAM_REQUESTS = registry.counter(
+    "upstream_requests_total", "API-Football calls by outcome (HTTP status, 'error' for transport failures).",
+    ["path", "outcome"]
+)
+
+
+def span(league, stage):
+    """Times a league build stage: `with metrics.span("PL", "elo_replay"): ...`"""
+    return LOAD_STAGE_SECONDS.time(league, stage)
+
+
+def render():
+    return registry.render()
@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import functools
+import threading
+import contextvars
+import io
+import inspect
+from pathlib import Path
+from dotenv import load_dotenv
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from services import metrics
+
+load_dotenv()
+
+# ---------------- SETTINGS ----------------
+# On demand: send `X-Profile: 1` (or `?profile=1`) together with an
+# `X-Profile-Token` listed in PROFILE_TOKENS. The response carries X-Profile-Id;
+# fetch the report from /admin/profiles/{id}.
+# Sampled: PROFILE_SAMPLE_RATE of all requests (e.g. 0.01) are profiled and
+# written to PROFILE_DIR for later aggregation (tools/profile_report.py).
+PROFILE_TOKENS = {t.strip() for t in os.getenv("PROFILE_TOKENS", "").split(",") if t.strip()}
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0") or 0)
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", Path(__file__).resolve().parent.parent / "profiles"))
+# Oldest .prof files beyond this are deleted
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "1000"))
+
+PROFILES = metrics.registry.counter(
+    "profiles_total", "Requests profiled (mode=\"request\" on demand, \"sampled\" otherwise).", ["route", "mode"]
+)
+
+_session = contextvars.ContextVar("profile_session", default=None)
+# Up to 3.11 each thread has its own profiler hook. From 3.12 cProfile runs on
+# sys.monitoring: one active profiler per process (a second enable() raises
+# ValueError), and it sees every thread.
+PER_THREAD_PROFILERS = sys.version_info < (3, 12)
+# Held by the event loop profiler (and, on 3.12+, by whichever profiler is active)
+_profiler_lock = threading.Lock()
+
+
+class ProfileSession:
+    def __init__(self, mode):
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.profiles = []
+        self.started = time.time()
+        self.loop_profiled = False
+
+
+def enabled():
+    return bool(PROFILE_TOKENS) or PROFILE_SAMPLE_RATE > 0
+
+
+def authorized(token):
+    return bool(token) and token in PROFILE_TOKENS
+
+
+def _start(prof):
+    # False when another profiling tool (debugger, coverage, a stray profiler) is active
+    try:
+        prof.enable()
+        return True
+    except ValueError:
+        return False
+
+
+# ---------------- ENDPOINT WRAPPER ----------------
+def wrap_endpoint(fn):
+    """
+    Sync endpoints run in the threadpool, out of reach of a profiler started on
+    the event loop; profile them in their own thread when a session is active.
+    """
+    if inspect.iscoroutinefunction(fn):
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        session = _session.get()
+        if session is None:
+            return fn(*args, **kwargs)
+        locked = False
+        if not PER_THREAD_PROFILERS:
+            # Only one profiler may run: the loop profiler already covers this
+            # thread; otherwise take the slot if nobody else holds it
+            if session.loop_profiled or not _profiler_lock.acquire(blocking=False):
+                return fn(*args, **kwargs)
+            locked = True
+        prof = cProfile.Profile()
+        if not _start(prof):
+            if locked:
+                _profiler_lock.release()
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            prof.disable()
+            if locked:
+                _profiler_lock.release()
+            session.profiles.append(prof)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, wrap_endpoint(endpoint), **kwargs)
+
+
+# ---------------- MIDDLEWARE ----------------
+def _wants_profile(scope):
+    flag = token = None
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            flag = value.decode("latin-1")
+        elif name == b"x-profile-token":
+            token = value.decode("latin-1")
+    if flag is None and b"profile=" in scope.get("query_string", b""):
+        for pair in scope["query_string"].decode("latin-1").split("&"):
+            if pair.startswith("profile="):
+                flag = pair[len("profile="):]
+    return flag in ("1", "true", "yes") and authorized(token)
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in cProfile per request. The event loop side (routing, validation,
+    async endpoints, serialization) is profiled here; sync endpoint bodies by
+    wrap_endpoint. Awaits inside an async route let other requests run on the
+    loop, so their loop-side work can show up in its profile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            return await self.app(scope, receive, send)
+
+        if _wants_profile(scope):
+            mode = "request"
+        elif PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            mode = "sampled"
+        else:
+            return await self.app(scope, receive, send)
+
+        session = ProfileSession(mode)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start" and mode == "request":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", session.id.encode())]
+            await send(message)
+
+        reset = _session.set(session)
+        # Concurrent profiled requests share the event loop, so only one of them
+        # profiles it at a time (the others keep their endpoint profile)
+        loop_prof = None
+        if _profiler_lock.acquire(blocking=False):
+            loop_prof = cProfile.Profile()
+            if not _start(loop_prof):
+                loop_prof = None
+                _profiler_lock.release()
+        session.loop_profiled = loop_prof is not None
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if loop_prof is not None:
+                loop_prof.disable()
+                _profiler_lock.release()
+                session.profiles.append(loop_prof)
+            _session.reset(reset)
+
+        route = getattr(scope.get("route"), "path", "unmatched")
+        try:
+            await run_in_threadpool(save, session, scope["method"], route)
+            PROFILES.inc(route, mode)
+        except Exception as e:
+            print(f"⚠️ Could not write profile {session.id}: {e}")
+
+
+# ---------------- STORAGE ----------------
+def _slug(route):
+    return route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+
+
+def save(session, method, route):
+    """Writes the merged profile as <time>_<METHOD>_<route>_<mode>_<id>.prof (pstats format)."""
+    if not session.profiles:
+        return None
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stats = pstats.Stats(session.profiles[0])
+    for prof in session.profiles[1:]:
+        stats.add(prof)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(session.started))
+    path = PROFILE_DIR / f"{stamp}_{method}_{_slug(route)}_{session.mode}_{session.id}.prof"
+    tmp = path.with_suffix(".tmp")
+    stats.dump_stats(tmp)
+    os.replace(tmp, path)
+    _prune()
+    return path
+
+
+def _prune():
+    files = sorted(PROFILE_DIR.glob("*.prof"))
+    for old in files[:max(0, len(files) - PROFILE_MAX_FILES)]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+def find(profile_id):
+    """Path of a stored profile by id, or None."""
+    if not profile_id.isalnum():
+        return None
+    return next(iter(PROFILE_DIR.glob(f"*_{profile_id}.prof")), None)
+
+
+def aggregate(paths):
+    """pstats.Stats summed over several .prof files (None if there are none)."""
+    stats = None
+    for path in paths:
+        if stats is None:
+            stats = pstats.Stats(str(path))
+        else:
+            stats.add(str(path))
+    return stats
+
+
+def report(stats, sort="cumulative", limit=40):
+    """Text table of the top `limit` functions, plus who called them."""
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats(sort).print_stats(limit)
+    stats.print_callers(limit)
+    return out.getvalue()
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with a per-entry TTL and single-flight coalescing:
+    concurrent async misses for one key share a single fetch.
+    """
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """(True, value) for a live entry, else (False, None)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def invalidate(self, predicate):
+        """Drops every entry whose key matches predicate(key)."""
+        with self._lock:
+            stale = [k for k in self._data if predicate(k)]
+            for k in stale:
+                del self._data[k]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def get_or_fetch(self, key, ttl, fetch):
+        """Sync read-through: fetch() on a miss, result cached for ttl seconds."""
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = fetch()
+        self.set(key, value, ttl)
+        return value
+
+    async def get_or_fetch_async(self, key, ttl, fetch):
+        """
+        Async read-through. fetch is a zero-arg coroutine function; while one
+        fetch for key is running, other callers await it instead of starting
+        their own. Failures are not cached and reach every waiter; cancelling
+        a waiter leaves the shared fetch running.
+        """
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = asyncio.ensure_future(fetch())
+        self._inflight[key] = task
+        # Settled by the task itself, so a cancelled first caller neither drops
+        # the in-flight entry early nor loses the result for the others
+        task.add_done_callback(lambda t: self._settle(key, ttl, t))
+        return await asyncio.shield(task)
+
+    def _settle(self, key, ttl, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # exception() also marks a failure as retrieved when nobody is left waiting
+        if not task.cancelled() and task.exception() is None:
+            self.set(key, task.result(), ttl)
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
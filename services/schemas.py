@@ -0,0 +1,173 @@
+import pandas as pd
+from pathlib import Path
+from services import metrics
+
+# ---------------- SOURCE SCHEMAS ----------------
+# Each known CSV layout declares which columns to read, their dtypes, how they
+# map to our canonical names and the date format(s) to try (in order).
+# Canonical columns: date, home, away, home_goals, away_goals
+MATCH_COLUMNS = ["date", "home", "away", "home_goals", "away_goals"]
+
+SOURCE_SCHEMAS = {
+    # football-data.co.uk (E0.csv, SP1.csv, ...). ~130 odds columns we never read.
+    "football_data": {
+        "columns": {
+            "Date": "date",
+            "HomeTeam": "home",
+            "AwayTeam": "away",
+            "FTHG": "home_goals",
+            "FTAG": "away_goals",
+        },
+        "dtypes": {"Date": "str", "HomeTeam": "str", "AwayTeam": "str", "FTHG": "float64", "FTAG": "float64"},
+        # Older seasons use two-digit years
+        "date_formats": ["%d/%m/%Y", "%d/%m/%y"],
+        "encoding": "latin1",
+        "aliases": {},
+    },
+    # International results feed (international_matches1.csv)
+    "international": {
+        "columns": {
+            "Date": "date",
+            "Home Team": "home",
+            "Away Team": "away",
+            "Home Goals": "home_goals",
+            "Away Goals": "away_goals",
+        },
+        "dtypes": {"Date": "str", "Home Team": "str", "Away Team": "str", "Home Goals": "float64", "Away Goals": "float64"},
+        "date_formats": ["%Y-%m-%d"],
+        "encoding": "latin1",
+        "aliases": {},
+    },
+    # World Cup match feed (world_cup_matches1.csv): only the tournament year is known,
+    # file order (ID) is kept within a year by the stable date sort.
+    "world_cup": {
+        "columns": {
+            "Year": "date",
+            "Home Team": "home",
+            "Away Team": "away",
+            "Home Goals": "home_goals",
+            "Away Goals": "away_goals",
+        },
+        "dtypes": {"Year": "str", "Home Team": "str", "Away Team": "str", "Home Goals": "float64", "Away Goals": "float64"},
+        "date_formats": ["%Y"],
+        "encoding": "latin1",
+        "aliases": {},
+    },
+    # Already-normalized files (premier_league_2023_24.csv, appended results)
+    "canonical": {
+        "columns": {c: c for c in MATCH_COLUMNS},
+        "dtypes": {"date": "str", "home": "str", "away": "str", "home_goals": "float64", "away_goals": "float64"},
+        "date_formats": ["%Y-%m-%d"],
+        "encoding": "latin1",
+        "aliases": {},
+    },
+}
+
+# Files above this size are read in chunks to cap peak memory
+CHUNK_THRESHOLD_BYTES = 64 * 1024 * 1024
+DEFAULT_CHUNKSIZE = 250_000
+
+
+def detect_schema(columns):
+    """Name of the first schema whose source columns are all present, else None."""
+    columns = set(columns)
+    for name, schema in SOURCE_SCHEMAS.items():
+        if all(c in columns for c in schema["columns"]):
+            return name
+    return None
+
+
+def parse_dates(values, formats):
+    """
+    Parses with each known format in turn (exact, fast path); anything left
+    falls back to pandas' mixed day-first parser.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    out = pd.to_datetime(values, format=formats[0], errors="coerce")
+    for fmt in formats[1:]:
+        missing = out.isna() & values.notna()
+        if not missing.any():
+            break
+        out[missing] = pd.to_datetime(values[missing], format=fmt, errors="coerce")
+
+    missing = out.isna() & values.notna()
+    if missing.any():
+        try:
+            out[missing] = pd.to_datetime(values[missing], dayfirst=True, format="mixed", errors="coerce")
+        except ValueError:
+            # Fallback for older pandas
+            out[missing] = pd.to_datetime(values[missing], dayfirst=True, errors="coerce")
+    return out
+
+
+def normalize(df, schema_name):
+    """Renames/casts a frame in the given schema to the canonical columns (unsorted)."""
+    schema = SOURCE_SCHEMAS[schema_name]
+    df = df[list(schema["columns"])].rename(columns=schema["columns"])
+
+    for side in ["home", "away"]:
+        names = df[side].str.strip()
+        if schema["aliases"]:
+            names = names.replace(schema["aliases"])
+        df[side] = names
+    for c in ["home_goals", "away_goals"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+
+    with metrics.DATE_PARSE_SECONDS.time(schema_name):
+        df["date"] = parse_dates(df["date"], schema["date_formats"])
+    return df.dropna(subset=["date"])
+
+
+def iter_matches(path, schema_name=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Streams canonical match chunks from a CSV, reading only the schema's columns.
+    Yields DataFrames of up to `chunksize` rows in file order.
+    """
+    if schema_name is None:
+        schema_name = sniff_schema(path)
+        if schema_name is None:
+            return
+    schema = SOURCE_SCHEMAS[schema_name]
+    reader = pd.read_csv(
+        path,
+        encoding=schema["encoding"],
+        usecols=list(schema["columns"]),
+        dtype=schema["dtypes"],
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        yield normalize(chunk, schema_name)
+
+
+def sniff_schema(path, encoding="latin1"):
+    header = pd.read_csv(path, encoding=encoding, nrows=0).columns
+    return detect_schema(header)
+
+
+def read_matches(path, chunksize=None):
+    """
+    Reads a CSV in any registered schema into a date-sorted canonical frame.
+    Returns (df, schema_name); df is None if the layout is unknown.
+    """
+    schema_name = sniff_schema(path)
+    if schema_name is None:
+        return None, None
+    schema = SOURCE_SCHEMAS[schema_name]
+
+    if chunksize is None and Path(path).stat().st_size > CHUNK_THRESHOLD_BYTES:
+        chunksize = DEFAULT_CHUNKSIZE
+
+    if chunksize:
+        df = pd.concat(list(iter_matches(path, schema_name, chunksize)), ignore_index=True)
+    else:
+        df = normalize(
+            pd.read_csv(
+                path,
+                encoding=schema["encoding"],
+                usecols=list(schema["columns"]),
+                dtype=schema["dtypes"],
+            ),
+            schema_name,
+        )
+    return df.sort_values("date", kind="stable").reset_index(drop=True), schema_name
@@ -0,0 +1,337 @@
+import json
+import os
+import shutil
+import socket
+import time
+import numpy as np
+import pandas as pd
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from models.elo_engine import EloEngine
+from models.form import FeatureStore
+from services.match_cache import source_fingerprint, fingerprint_matches
+
+# Bump when the snapshot layout (or anything it is derived from) changes
+SNAPSHOT_VERSION = 2
+
+# ---------------- LAYOUT ----------------
+# <cache_dir>/<league>.snapshot.json     {"generation": N}, the build every worker should serve
+# <cache_dir>/<league>.snapshot.g<N>/
+#   meta.json        version, generation, source fingerprint, build params, Elo settings, last_date
+#   <name>.npy       one array per field, loaded memory-mapped (read-only)
+# Every worker maps the same generation directory, so the large arrays (rating history,
+# probability matrix) live once in the OS page cache rather than once per process.
+PROB_KEYS = ["home_win", "draw", "away_win", "elo_diff", "power_diff"]
+
+# Generations kept on disk (older ones may still be mapped by a slow worker)
+KEEP_GENERATIONS = 2
+
+# Longest wait for another worker's build before giving up (LockTimeout)
+LOCK_WAIT_SECONDS = 600
+# A lock file still without an owner after this long was left by a crash mid-create
+LOCK_WRITE_GRACE_SECONDS = 10
+
+
+class LockTimeout(TimeoutError):
+    """Another live process held the build lock for longer than the wait allowed."""
+
+
+def _cache_root(csv_path, cache_dir=None):
+    return Path(cache_dir) if cache_dir else Path(csv_path).parent / ".cache"
+
+
+def pointer_path(league_code, csv_path, cache_dir=None):
+    return _cache_root(csv_path, cache_dir) / f"{league_code}.snapshot.json"
+
+
+def snapshot_dir(league_code, csv_path, cache_dir=None, generation=None):
+    if generation is None:
+        generation = current_generation(league_code, csv_path, cache_dir)
+    return _cache_root(csv_path, cache_dir) / f"{league_code}.snapshot.g{generation}"
+
+
+def current_generation(league_code, csv_path, cache_dir=None):
+    """Published generation for a league (0 if none). One small file read."""
+    try:
+        with open(pointer_path(league_code, csv_path, cache_dir), "r") as f:
+            return int(json.load(f)["generation"])
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def _pid_alive(pid):
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        # PROCESS_QUERY_LIMITED_INFORMATION; access denied still means it exists
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return kernel32.GetLastError() == 5
+        code = ctypes.c_ulong()
+        ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return not ok or code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _lock_is_stale(lock):
+    """True only when the owner recorded in the lock file is known to be dead."""
+    try:
+        with open(lock, "r") as f:
+            owner = json.load(f)
+        pid, host = int(owner["pid"]), owner["host"]
+    except (ValueError, KeyError, TypeError):
+        # Created but never written: give the owner a moment to fill it in
+        return time.time() - lock.stat().st_mtime > LOCK_WRITE_GRACE_SECONDS
+    # Another machine's process can't be checked from here
+    return host == socket.gethostname() and not _pid_alive(pid)
+
+
+@contextmanager
+def build_lock(league_code, csv_path, cache_dir=None, timeout=None):
+    """
+    Cross-process lock (O_EXCL lock file holding the owner's pid) so only one
+    worker builds or appends to a league at a time; the others wait, then load
+    the snapshot it published. A lock is only broken when its owner has died;
+    raises LockTimeout after `timeout` seconds (default LOCK_WAIT_SECONDS).
+    """
+    root = _cache_root(csv_path, cache_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    lock = root / f"{league_code}.snapshot.lock"
+    deadline = time.monotonic() + (LOCK_WAIT_SECONDS if timeout is None else timeout)
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if _lock_is_stale(lock):
+                    print(f"⚠️ Removing {lock.name} left by a process that no longer runs.")
+                    os.remove(lock)
+                    continue
+            except OSError:
+                continue  # released (or replaced) while we looked
+            if time.monotonic() > deadline:
+                raise LockTimeout(f"{lock} is still held by another process")
+            time.sleep(0.1)
+            continue
+        with os.fdopen(fd, "w") as f:
+            json.dump({"pid": os.getpid(), "host": socket.gethostname()}, f)
+        break
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock)
+        except OSError:
+            pass
+
+
+def _str_array(values):
+    return np.asarray(list(values), dtype=str)
+
+
+def _padded(windows, key, width):
+    out = np.full((len(windows), width), np.nan)
+    for i, w in enumerate(windows):
+        values = list(w[key])
+        out[i, :len(values)] = values
+    return out
+
+
+def save_snapshot(ctx, league_code, csv_path, cache_dir=None, params=None):
+    """
+    Writes a built league context as the next snapshot generation and publishes it.
+    Returns the new generation number. Callers hold build_lock, which keeps the
+    generation number, the arrays and the pointer update to one writer at a time.
+    """
+    generation = current_generation(league_code, csv_path, cache_dir) + 1
+    target = snapshot_dir(league_code, csv_path, cache_dir, generation)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+
+    elo = ctx["predictor"].elo_engine
+    hist = elo.history
+    power_table = ctx["power_table"]
+    final_stats = ctx["final_stats"]
+    form_teams = list(ctx["form"])
+    form = [ctx["form"][t] for t in form_teams]
+    table = ctx["standings"]["table"]
+    played = sorted(ctx["standings"]["played"])
+    features = ctx["features"]
+
+    arrays = {
+        # Elo: interned ids, current ratings (team_elos order) and timeline
+        "elo_id_teams": _str_array(elo.team_names),
+        "elo_teams": _str_array(elo.team_elos),
+        "elo_values": np.fromiter(elo.team_elos.values(), dtype=np.float64, count=len(elo.team_elos)),
+        "hist_team_idx": hist.team_idx,
+        "hist_days": hist.days,
+        "hist_ratings": hist.ratings,
+        # Power table (already sorted) and final stats
+        "power_team": _str_array(power_table["team"]),
+        "power_score": power_table["power_score"].to_numpy(dtype=np.float64),
+        "power_elo": power_table["elo"].to_numpy(dtype=np.float64),
+        "power_gf_last10": power_table["gf_last10"].to_numpy(dtype=np.float64),
+        "power_ga_last10": power_table["ga_last10"].to_numpy(dtype=np.float64),
+        "power_pts_last5": power_table["pts_last5"].to_numpy(dtype=np.float64),
+        "stats_team": _str_array(final_stats["team"]),
+        "stats_pts_last5": final_stats["pts_last5"].to_numpy(dtype=np.float64),
+        "stats_gf_last10": final_stats["gf_last10"].to_numpy(dtype=np.float64),
+        "stats_ga_last10": final_stats["ga_last10"].to_numpy(dtype=np.float64),
+        # Form windows, NaN padded
+        "form_team": _str_array(form_teams),
+        "form_last_date": np.array([w["last_date"] for w in form], dtype="datetime64[ns]"),
+        "form_gf": _padded(form, "gf", params["goals_window"]),
+        "form_ga": _padded(form, "ga", params["goals_window"]),
+        "form_pts": _padded(form, "pts", params["pts_window"]),
+        # Point-in-time form features
+        "feat_id_teams": _str_array(features.team_names),
+        "feat_team_idx": features.team_idx,
+        "feat_days": features.days,
+        "feat_raw": features.raw,
+        "feat_values": features.values,
+        # Standings
+        "table_team": _str_array(table),
+        "table_values": np.array(
+            [[r["points"], r["gf"], r["ga"], r["played"]] for r in table.values()], dtype=np.float64
+        ).reshape(-1, 4),
+        "played_home": _str_array(h for h, _ in played),
+        "played_away": _str_array(a for _, a in played),
+    }
+    matrix = ctx.get("prob_matrix")
+    if matrix is not None:
+        arrays["prob_teams"] = _str_array(matrix["teams"])
+        for key in PROB_KEYS:
+            arrays[f"prob_{key}"] = np.asarray(matrix[key])
+
+    for name, arr in arrays.items():
+        np.save(tmp / f"{name}.npy", arr, allow_pickle=False)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "generation": generation,
+        "league": league_code,
+        "source": source_fingerprint(csv_path),
+        "params": params or {},
+        "elo": {"k": elo.k, "base_elo": elo.base_elo},
+        "last_date": pd.Timestamp(ctx["last_date"]).isoformat(),
+        "has_matrix": matrix is not None,
+    }
+    with open(tmp / "meta.json", "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # Publish: complete directory first, then the pointer (atomic replace)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    pointer = pointer_path(league_code, csv_path, cache_dir)
+    pointer_tmp = pointer.with_suffix(".tmp")
+    with open(pointer_tmp, "w") as f:
+        json.dump({"generation": generation}, f)
+    os.replace(pointer_tmp, pointer)
+
+    # Best effort: files still mapped elsewhere (Windows) are left for next time
+    for old in target.parent.glob(f"{league_code}.snapshot.g*"):
+        try:
+            old_gen = int(old.name.rsplit(".g", 1)[1])
+        except ValueError:
+            continue
+        if old_gen <= generation - KEEP_GENERATIONS:
+            shutil.rmtree(old, ignore_errors=True)
+    return generation
+
+
+def load_snapshot(league_code, csv_path, cache_dir=None, params=None):
+    """
+    Context parts from the published snapshot (arrays memory-mapped), or None if
+    it is missing, from an older version/params, or the source file changed.
+    """
+    generation = current_generation(league_code, csv_path, cache_dir)
+    if generation == 0:
+        return None
+    target = snapshot_dir(league_code, csv_path, cache_dir, generation)
+    meta_path = target / "meta.json"
+    if not meta_path.exists():
+        return None
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    if meta.get("version") != SNAPSHOT_VERSION or meta.get("params") != (params or {}):
+        return None
+    if not fingerprint_matches(meta["source"], csv_path):
+        return None
+
+    def arr(name):
+        return np.load(target / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+
+    # Elo engine
+    elo = EloEngine(base_elo=meta["elo"]["base_elo"], k=meta["elo"]["k"])
+    elo.team_names = arr("elo_id_teams").tolist()
+    elo.team_ids = {t: i for i, t in enumerate(elo.team_names)}
+    elo.team_elos = dict(zip(arr("elo_teams").tolist(), arr("elo_values").tolist()))
+    elo.history.set_arrays(arr("hist_team_idx"), arr("hist_days"), arr("hist_ratings"))
+
+    features = FeatureStore(params["pts_window"], params["goals_window"], params["ewm_spans"])
+    features.team_names = arr("feat_id_teams").tolist()
+    features.team_ids = {t: i for i, t in enumerate(features.team_names)}
+    features.set_arrays(arr("feat_team_idx"), arr("feat_days"), arr("feat_raw"), arr("feat_values"))
+
+    power_table = pd.DataFrame({
+        "team": arr("power_team").tolist(),
+        "power_score": arr("power_score"),
+        "elo": arr("power_elo"),
+        "gf_last10": arr("power_gf_last10"),
+        "ga_last10": arr("power_ga_last10"),
+        "pts_last5": arr("power_pts_last5"),
+    })
+    final_stats = pd.DataFrame({
+        "team": arr("stats_team").tolist(),
+        "pts_last5": arr("stats_pts_last5"),
+        "gf_last10": arr("stats_gf_last10"),
+        "ga_last10": arr("stats_ga_last10"),
+    })
+
+    form = {}
+    gf, ga, pts = arr("form_gf"), arr("form_ga"), arr("form_pts")
+    for i, (team, last_date) in enumerate(zip(arr("form_team").tolist(), arr("form_last_date"))):
+        form[team] = {
+            "last_date": pd.Timestamp(last_date),
+            "gf": deque([v for v in gf[i].tolist() if v == v], maxlen=params["goals_window"]),
+            "ga": deque([v for v in ga[i].tolist() if v == v], maxlen=params["goals_window"]),
+            "pts": deque([v for v in pts[i].tolist() if v == v], maxlen=params["pts_window"]),
+        }
+
+    table = {
+        team: {"points": int(v[0]), "gf": v[1], "ga": v[2], "played": int(v[3])}
+        for team, v in zip(arr("table_team").tolist(), arr("table_values").tolist())
+    }
+    standings = {
+        "table": table,
+        "played": set(zip(arr("played_home").tolist(), arr("played_away").tolist())),
+    }
+
+    prob_matrix = None
+    if meta["has_matrix"]:
+        teams = arr("prob_teams").tolist()
+        prob_matrix = {"teams": teams, "index": {t: i for i, t in enumerate(teams)}}
+        for key in PROB_KEYS:
+            prob_matrix[key] = arr(f"prob_{key}")
+
+    return {
+        "elo": elo,
+        "power_table": power_table,
+        "final_stats": final_stats,
+        "form": form,
+        "standings": standings,
+        "last_date": pd.Timestamp(meta["last_date"]),
+        "prob_matrix": prob_matrix,
+        "features": features,
+        "generation": meta["generation"],
+    }
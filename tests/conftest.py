@@ -0,0 +1,28 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add the repo root to the path to import models / services
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def league_csv(tmp_path):
+    """Small football-data style league (E0 layout) with one unplayed fixture."""
+    teams = ["Arsenal", "Chelsea", "Everton", "Man City", "Wolves"]
+    rows = []
+    day = pd.Timestamp("2024-08-10")
+    for r in range(3):
+        for i, home in enumerate(teams):
+            for away in teams[i + 1:]:
+                rows.append({"Div": "E0", "Date": day.strftime("%d/%m/%Y"), "HomeTeam": home, "AwayTeam": away,
+                             "FTHG": (r + i) % 4, "FTAG": r % 3})
+                day += pd.Timedelta(days=1)
+    df = pd.DataFrame(rows, dtype=object)
+    df.loc[(df["HomeTeam"] == "Man City") & (df["AwayTeam"] == "Wolves"), "FTHG"] = np.nan
+    path = tmp_path / "E0.csv"
+    df.to_csv(path, index=False)
+    return path
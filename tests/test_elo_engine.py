@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from models.elo_engine import EloEngine
+
+
+def _season(n_days=60):
+    teams = ["Arsenal", "Chelsea", "Everton", "Wolves", "Fulham", "Brentford"]
+    rng = np.random.default_rng(0)
+    rows = []
+    for d in range(n_days):
+        home, away = rng.choice(teams, 2, replace=False)
+        rows.append({"date": pd.Timestamp("2024-08-01") + pd.Timedelta(days=d), "home": home, "away": away,
+                     "home_goals": int(rng.integers(0, 4)), "away_goals": int(rng.integers(0, 4))})
+    return pd.DataFrame(rows)
+
+
+def test_history_appends_match_single_replay():
+    df = _season()
+    whole = EloEngine()
+    whole.compute_season(df)
+    parts = EloEngine()
+    for lo in range(0, len(df), 7):
+        parts.compute_season(df.iloc[lo:lo + 7])
+
+    np.testing.assert_array_equal(whole.history.team_idx, parts.history.team_idx)
+    np.testing.assert_array_equal(whole.history.ratings, parts.history.ratings)
+    dates = df["date"] + pd.Timedelta(days=1)
+    assert whole.ratings_as_of(df["home"], dates).tolist() == parts.ratings_as_of(df["home"], dates).tolist()
+
+
+def test_lookups_are_read_only_across_threads():
+    df = _season()
+    elo = EloEngine()
+    elo.compute_season(df)
+    teams = list(df["home"]) * 20
+    dates = list(df["date"]) * 20
+    expected = elo.ratings_as_of(teams, dates)
+
+    state = elo.history._state
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: elo.ratings_as_of(teams, dates), range(32)))
+    assert all(np.array_equal(r, expected) for r in results)
+    # Reads never rebuild or replace the timeline
+    assert elo.history._state is state
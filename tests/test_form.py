@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from models import backtest
+from models.form import FeatureStore, rolling_form
+
+
+def _matches():
+    # Round robin of 4 teams, with one match missing its score
+    teams = ["Arsenal", "Chelsea", "Everton", "Wolves"]
+    rows = []
+    day = pd.Timestamp("2024-08-01")
+    for r in range(4):
+        for i, home in enumerate(teams):
+            for away in teams[i + 1:]:
+                rows.append({"date": day, "home": home, "away": away,
+                             "home_goals": float((r + i) % 4), "away_goals": float(r % 3)})
+                day += pd.Timedelta(days=1)
+    df = pd.DataFrame(rows)
+    df.loc[5, ["home_goals", "away_goals"]] = np.nan
+    return df
+
+
+def _long(df):
+    home = pd.DataFrame({"team": df["home"], "date": df["date"], "gf": df["home_goals"], "ga": df["away_goals"]})
+    away = pd.DataFrame({"team": df["away"], "date": df["date"], "gf": df["away_goals"], "ga": df["home_goals"]})
+    return pd.concat([home, away], ignore_index=True).sort_values(["team", "date"], kind="stable")
+
+
+def test_rolling_form_nan_score_matches_pandas():
+    df = _matches()
+    long = _long(df)
+    form = rolling_form(long["team"], long["date"], long["gf"], long["ga"], pts_window=5, goals_window=3, ewm_spans=(4,))
+
+    grouped = long.groupby("team", sort=True)
+    expected_gf = grouped["gf"].transform(lambda s: s.rolling(3, min_periods=1).mean()).to_numpy()
+    expected_ewm = grouped["ga"].transform(lambda s: s.ewm(span=4).mean()).to_numpy()
+
+    np.testing.assert_allclose(form["gf_last3"], expected_gf)
+    np.testing.assert_allclose(form["ga_ewm4"], expected_ewm)
+    # The missing score stays out of every window, including other teams'
+    assert np.isfinite(form["gf_last3"]).all()
+    assert np.isfinite(form["pts_last5"]).all()
+
+
+def test_feature_store_append_with_nan_score():
+    df = _matches()
+    full = FeatureStore(pts_window=5, goals_window=3, ewm_spans=(4,))
+    full.append_matches(df)
+
+    incremental = FeatureStore(pts_window=5, goals_window=3, ewm_spans=(4,))
+    for lo in range(0, len(df), 4):
+        incremental.append_matches(df.iloc[lo:lo + 4])
+
+    assert np.isfinite(full.values).all()
+    for team in ["Arsenal", "Chelsea", "Everton", "Wolves"]:
+        pd.testing.assert_frame_equal(full.team_history(team), incremental.team_history(team))
+
+
+def test_prepare_matches_drops_unplayed():
+    df = _matches()
+    data = backtest.prepare_matches(df, warmup=0)
+    assert len(data["outcome"]) == len(df) - 1
+    assert np.isfinite(data["post_form"]).all()
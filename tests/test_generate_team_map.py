@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+from services import external_data
+from tools import generate_team_map
+
+
+class StubApi:
+    """Minimal API-Football /teams search on localhost; records every request."""
+
+    def __init__(self, ids, delay=0.2):
+        self.ids = dict(ids)
+        self.delay = delay
+        self.requests = []  # (start time, team)
+        self.inflight = 0
+        self.max_inflight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                team = parse_qs(url.query).get("search", [""])[0]
+                with stub._lock:
+                    stub.requests.append((time.monotonic(), team))
+                    stub.inflight += 1
+                    stub.max_inflight = max(stub.max_inflight, stub.inflight)
+                time.sleep(stub.delay)
+                with stub._lock:
+                    stub.inflight -= 1
+                tid = stub.ids.get(team) if url.path == "/teams" else None
+                body = {"errors": [], "response": [{"team": {"id": tid}}] if tid else []}
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def teams_requested(self):
+        return sorted(team for _, team in self.requests)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    # main() points the client at the stub; restore the module afterwards
+    monkeypatch.setattr(external_data, "BASE_URL", external_data.BASE_URL)
+    monkeypatch.setattr(external_data, "API_KEY", None)
+    external_data.response_cache.clear()
+    api = StubApi({"Arsenal": 42, "Chelsea": 49, "Everton": 45, "Wolves": 39})
+    yield api
+    api.close()
+    external_data.response_cache.clear()
+
+
+def _write_csv(data_dir, teams):
+    rows = [
+        {"Div": "E0", "Date": f"{10 + i:02d}/08/2024", "HomeTeam": home, "AwayTeam": away, "FTHG": 1, "FTAG": 0}
+        for i, (home, away) in enumerate(zip(teams[0::2], teams[1::2]))
+    ]
+    pd.DataFrame(rows).to_csv(data_dir / "E0.csv", index=False)
+
+
+def _run(stub, data_dir, *extra):
+    external_data.response_cache.clear()  # each CLI run is a fresh process
+    generate_team_map.main([
+        "--data-dir", str(data_dir), "--base-url", stub.url,
+        "--rate", "20", "--burst", "1", "--workers", "4", *extra,
+    ])
+    mapping = json.loads((data_dir / "team_id_map.json").read_text())
+    journal = generate_team_map.journal_path(data_dir / "team_id_map.json")
+    return mapping, generate_team_map.read_journal(journal)
+
+
+def test_resolve_concurrently_under_rate_limit(stub, tmp_path):
+    _write_csv(tmp_path, ["Arsenal", "Chelsea", "Everton", "Wolves", "Nowhere FC", "Arsenal"])
+    mapping, (found, failed) = _run(stub, tmp_path)
+
+    assert stub.teams_requested() == ["Arsenal", "Chelsea", "Everton", "Nowhere FC", "Wolves"]
+    # Several requests overlap, but they start no faster than --rate allows
+    assert stub.max_inflight > 1
+    starts = sorted(t for t, _ in stub.requests)
+    assert starts[-1] - starts[0] >= (len(starts) - 1) / 20 * 0.9
+    assert mapping == {"Arsenal": 42, "Chelsea": 49, "Everton": 45, "Wolves": 39}
+    # The journal is compacted to the teams that weren't found
+    assert found == {} and failed == {"Nowhere FC"}
+
+
+def test_resume_from_journal_and_force(stub, tmp_path):
+    _write_csv(tmp_path, ["Arsenal", "Chelsea", "Everton", "Wolves", "Nowhere FC", "Arsenal"])
+    # An interrupted run: one mapping saved, two answers only in the journal
+    (tmp_path / "team_id_map.json").write_text(json.dumps({"Arsenal": 42}))
+    journal = generate_team_map.journal_path(tmp_path / "team_id_map.json")
+    journal.write_text(
+        json.dumps({"team": "Chelsea", "id": 49}) + "\n"
+        + json.dumps({"team": "Nowhere FC", "id": None}) + "\n"
+        + '{"team": "Evert'  # partial last line
+    )
+
+    mapping, (_, failed) = _run(stub, tmp_path)
+    assert stub.teams_requested() == ["Everton", "Wolves"]
+    assert mapping == {"Arsenal": 42, "Chelsea": 49, "Everton": 45, "Wolves": 39}
+    assert failed == {"Nowhere FC"}
+
+    # Known failures are skipped on the next run...
+    stub.requests.clear()
+    stub.ids["Nowhere FC"] = 7
+    _run(stub, tmp_path)
+    assert stub.requests == []
+
+    # ...and retried with --force, merging the new hit into the mapping
+    mapping, (_, failed) = _run(stub, tmp_path, "--force")
+    assert stub.teams_requested() == ["Nowhere FC"]
+    assert mapping["Nowhere FC"] == 7 and failed == set()
@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.league_manager import LeagueManager
+
+
+def test_power_table_with_unplayed_match(league_csv):
+    path = league_csv
+    manager = LeagueManager(use_cache=False)
+    manager.load_league("PL", path)
+
+    ctx = manager.get_league("PL")
+    json.dumps(ctx["power_table"].to_dict("records"), allow_nan=False)
+    assert np.isfinite(ctx["features"].values).all()
+
+    manager.append_results("PL", [
+        {"date": "2025-01-01", "home": "Wolves", "away": "Arsenal", "home_goals": np.nan, "away_goals": 1},
+        {"date": "2025-01-02", "home": "Chelsea", "away": "Everton", "home_goals": 2, "away_goals": 2},
+    ])
+    updated = manager.get_league("PL")
+    json.dumps(updated["power_table"].to_dict("records"), allow_nan=False)
+    # The published context before the append is left as it was
+    assert ctx["standings"]["table"]["Chelsea"]["played"] + 1 == updated["standings"]["table"]["Chelsea"]["played"]
+
+
+def test_append_rejects_back_dated_results(league_csv):
+    path = league_csv
+    manager = LeagueManager(use_cache=False)
+    manager.load_league("PL", path)
+    ctx = manager.get_league("PL")
+
+    with pytest.raises(ValueError, match="can't be appended"):
+        manager.append_results("PL", [
+            {"date": "2024-08-01", "home": "Arsenal", "away": "Chelsea", "home_goals": 1, "away_goals": 0},
+        ])
+    assert manager.get_league("PL") is ctx
+
+    # Same day as the last match is still in order
+    last = ctx["last_date"]
+    manager.append_results("PL", [
+        {"date": last, "home": "Arsenal", "away": "Chelsea", "home_goals": 1, "away_goals": 0},
+    ])
+    elo = manager.get_league("PL")["predictor"].elo_engine
+    assert elo.rating_as_of("Arsenal", last) == ctx["predictor"].elo_engine.rating_as_of("Arsenal", last)
+
+
+def test_default_prediction_uses_the_given_context(league_csv):
+    path = league_csv
+    manager = LeagueManager(use_cache=False)
+    manager.load_league("PL", path)
+    old = manager.get_league("PL")
+    before = manager.default_prediction("PL", "Arsenal", "Chelsea")
+
+    manager.append_results("PL", [
+        {"date": "2025-01-01", "home": "Chelsea", "away": "Arsenal", "home_goals": 5, "away_goals": 0},
+    ])
+    assert manager.default_prediction("PL", "Arsenal", "Chelsea") != before
+    assert manager.default_prediction("PL", "Arsenal", "Chelsea", old) == before
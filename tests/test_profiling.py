@@ -0,0 +1,76 @@
+import cProfile
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services import profiling
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_TOKENS", {"secret"})
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    app = FastAPI()
+    app.router.route_class = profiling.ProfiledRoute
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+    @app.get("/sync")
+    def sync_route():
+        return {"total": sum(range(1000))}
+
+    return TestClient(app)
+
+
+def _profiled(client):
+    return client.get("/sync", headers={"X-Profile": "1", "X-Profile-Token": "secret"})
+
+
+def test_profile_covers_sync_endpoint(client):
+    r = _profiled(client)
+    stats = profiling.aggregate([profiling.find(r.headers["x-profile-id"])])
+    assert any(func[2] == "sync_route" for func in stats.stats)
+
+
+class _Tracked(cProfile.Profile):
+    # Fails like cProfile on 3.12+ when a second profiler is enabled
+    active = 0
+    started = 0
+
+    def enable(self, *args, **kwargs):
+        if not profiling.PER_THREAD_PROFILERS and _Tracked.active:
+            raise ValueError("Another profiling tool is already active")
+        _Tracked.active += 1
+        _Tracked.started += 1
+        self._on = True
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        # pstats disables again when it reads the profile
+        if getattr(self, "_on", False):
+            _Tracked.active -= 1
+            self._on = False
+        super().disable()
+
+
+def test_one_profiler_at_a_time_on_shared_monitoring(client, monkeypatch):
+    monkeypatch.setattr(profiling, "PER_THREAD_PROFILERS", False)
+    monkeypatch.setattr(profiling.cProfile, "Profile", _Tracked)
+    r = _profiled(client)
+    assert r.status_code == 200 and r.json() == {"total": 499500}
+    assert profiling.find(r.headers["x-profile-id"]) is not None
+    # The loop profiler covers the endpoint thread, so no second one is started
+    assert _Tracked.started == 1 and _Tracked.active == 0
+
+
+def test_profiler_conflict_still_serves_the_request(client, monkeypatch):
+    class Busy(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling.cProfile, "Profile", Busy)
+    r = _profiled(client)
+    assert r.status_code == 200 and r.json() == {"total": 499500}
+    # Nothing was profiled, and the slot was released for later requests
+    assert profiling._profiler_lock.acquire(blocking=False)
+    profiling._profiler_lock.release()
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from services.response_cache import TTLCache
+
+
+class Fetcher:
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self.result = result
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return self.result
+
+
+async def _waiters(cache, fetch, n):
+    tasks = [asyncio.ensure_future(cache.get_or_fetch_async("k", 60, fetch)) for _ in range(n)]
+    await asyncio.sleep(0)  # every caller is now waiting on the shared fetch
+    return tasks
+
+
+def test_concurrent_callers_share_one_fetch():
+    async def run():
+        cache = TTLCache()
+        fetch = Fetcher(result={"id": 1})
+        tasks = await _waiters(cache, fetch, 10)
+        fetch.release.set()
+        results = await asyncio.gather(*tasks)
+        assert fetch.calls == 1
+        assert all(r == {"id": 1} for r in results)
+        assert cache.get("k") == (True, {"id": 1})
+        assert cache.stats()["coalesced"] == 9
+
+    asyncio.run(run())
+
+
+def test_failed_fetch_reaches_every_waiter_and_is_not_cached():
+    async def run():
+        cache = TTLCache()
+        fetch = Fetcher(error=RuntimeError("upstream down"))
+        tasks = await _waiters(cache, fetch, 5)
+        fetch.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert fetch.calls == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert cache.get("k") == (False, None)
+
+        # The next call fetches again
+        retry = Fetcher(result=2)
+        retry.release.set()
+        assert await cache.get_or_fetch_async("k", 60, retry) == 2
+        assert retry.calls == 1
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("cancelled", [0, 2])  # the first caller (which started the fetch) or a later one
+def test_cancelling_a_waiter_keeps_the_shared_fetch(cancelled):
+    async def run():
+        cache = TTLCache()
+        fetch = Fetcher(result="v")
+        tasks = await _waiters(cache, fetch, 4)
+        tasks[cancelled].cancel()
+        await asyncio.sleep(0)
+
+        # A caller arriving now still joins the running fetch
+        late = asyncio.ensure_future(cache.get_or_fetch_async("k", 60, fetch))
+        await asyncio.sleep(0)
+        fetch.release.set()
+        others = [t for i, t in enumerate(tasks) if i != cancelled] + [late]
+        assert await asyncio.gather(*others) == ["v"] * len(others)
+        assert tasks[cancelled].cancelled()
+        assert fetch.calls == 1
+        assert cache.get("k") == (True, "v")
+
+    asyncio.run(run())
@@ -0,0 +1,58 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from services import snapshot
+from services.league_manager import LeagueManager
+
+
+def _hold_lock(cache_dir, pid, age=0):
+    lock = cache_dir / "PL.snapshot.lock"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    lock.write_text(json.dumps({"pid": pid, "host": socket.gethostname()}))
+    if age:
+        os.utime(lock, (time.time() - age, time.time() - age))
+    return lock
+
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_lock_of_dead_owner_is_broken(tmp_path):
+    lock = _hold_lock(tmp_path, _dead_pid())
+    with snapshot.build_lock("PL", tmp_path / "E0.csv", tmp_path, timeout=1):
+        assert json.loads(lock.read_text())["pid"] == os.getpid()
+    assert not lock.exists()
+
+
+def test_old_lock_of_live_owner_is_kept(tmp_path):
+    # Age alone doesn't make a lock stale: a slow build still owns it
+    lock = _hold_lock(tmp_path, os.getpid(), age=3600)
+    with pytest.raises(snapshot.LockTimeout):
+        with snapshot.build_lock("PL", tmp_path / "E0.csv", tmp_path, timeout=0.3):
+            pass
+    assert lock.exists()
+
+
+def test_load_waits_then_serves_published_snapshot(league_csv, tmp_path, monkeypatch):
+    path = league_csv
+    cache = tmp_path / "cache"
+    LeagueManager(cache_dir=cache).load_league("PL", path)
+    assert snapshot.current_generation("PL", path, cache) == 1
+
+    # Another live worker is rebuilding: the rebuild request times out and
+    # serves generation 1 instead of writing alongside it
+    _hold_lock(cache, os.getpid())
+    monkeypatch.setattr(snapshot, "LOCK_WAIT_SECONDS", 0.3)
+    manager = LeagueManager(cache_dir=cache)
+    manager.load_league("PL", path, rebuild_cache=True)
+    assert manager.get_league("PL")["generation"] == 1
+    assert snapshot.current_generation("PL", path, cache) == 1
@@ -0,0 +1,272 @@
+import sys
+import os
+import io
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import subprocess
+from pathlib import Path
+
+# Add parent directory to path to import services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from models.elo_engine import EloEngine
+from models.preview import generate_match_preview
+from services import schemas
+from services.league_manager import LeagueManager
+from tools.generate_synthetic_data import write_csv
+
+# "<matches>x<teams>" per scale point
+DEFAULT_SIZES = ["10000x20", "100000x200"]
+DEFAULT_REPEAT = 5
+# Compare mode: a benchmark is a regression when its median is this much slower
+DEFAULT_THRESHOLD = 1.20
+
+BENCH_LEAGUE = "BENCH"
+PREDICT_CALLS = 2000
+ROUTE_CALLS = 200
+
+
+def parse_size(size):
+    matches, teams = size.lower().split("x")
+    return int(float(matches)), int(teams)
+
+
+def timed(fn, repeat, calls=1):
+    """Runs fn() `repeat` times (prints silenced); seconds per call for each run."""
+    runs = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            runs.append((time.perf_counter() - start) / calls)
+    return runs
+
+
+def summarize(name, size, runs, calls):
+    return {
+        "name": name,
+        "size": size,
+        "calls": calls,
+        "repeat": len(runs),
+        "min_s": min(runs),
+        "median_s": statistics.median(runs),
+        "mean_s": statistics.fmean(runs),
+    }
+
+
+# ---------------- BENCHMARKS ----------------
+# Each takes the shared state for one size and returns (fn, calls per run)
+def bench_read_matches(state):
+    return lambda: schemas.read_matches(state["csv"]), 1
+
+def bench_elo_compute_season(state):
+    return lambda: EloEngine().compute_season(state["df"]), 1
+
+def bench_compute_stats(state):
+    return lambda: state["manager"]._compute_stats(state["df"]), 1
+
+def bench_load_league_cold(state):
+    def run():
+        LeagueManager(use_cache=False).load_league(BENCH_LEAGUE, state["csv"])
+    return run, 1
+
+def bench_load_league_snapshot(state):
+    def run():
+        LeagueManager(cache_dir=state["cache_dir"]).load_league(BENCH_LEAGUE, state["csv"])
+    return run, 1
+
+def bench_predict_match(state):
+    predictor = state["ctx"]["predictor"]
+    pairs = state["pairs"]
+    injuries = [{"name": "x", "position": "MID", "impact": 5}]
+    def run():
+        for h, a in pairs:
+            predictor.predict_match(h, a, injuries, None, 3, 7)
+    return run, len(pairs)
+
+def bench_predict_many(state):
+    predictor = state["ctx"]["predictor"]
+    homes = [h for h, _ in state["pairs"]]
+    aways = [a for _, a in state["pairs"]]
+    return lambda: predictor.predict_many(homes, aways, 5, 0, 3, 7), 1
+
+def bench_generate_match_preview(state):
+    ctx = state["ctx"]
+    pairs = state["pairs"][:ROUTE_CALLS]
+    def run():
+        for h, a in pairs:
+            generate_match_preview(h, a, ctx["predictor"], team_index=ctx["team_index"])
+    return run, len(pairs)
+
+def _route_bench(method, url_for):
+    def bench(state):
+        client = state["client"]
+        pairs = state["pairs"][:ROUTE_CALLS]
+        def run():
+            for i, pair in enumerate(pairs):
+                kwargs = url_for(i, pair)
+                r = getattr(client, method)(kwargs.pop("url"), **kwargs)
+                r.raise_for_status()
+        return run, len(pairs)
+    return bench
+
+BENCHMARKS = {
+    "read_matches": bench_read_matches,
+    "elo_compute_season": bench_elo_compute_season,
+    "compute_stats": bench_compute_stats,
+    "load_league_cold": bench_load_league_cold,
+    "load_league_snapshot": bench_load_league_snapshot,
+    "predict_match": bench_predict_match,
+    "predict_many": bench_predict_many,
+    "generate_match_preview": bench_generate_match_preview,
+    "route_predict": _route_bench("post", lambda i, p: {
+        # Distinct rest days so most calls miss the /predict memo
+        "url": "/predict",
+        "json": {"home": p[0], "away": p[1], "league": BENCH_LEAGUE, "home_rest_days": i % 50},
+    }),
+    "route_preview": _route_bench("get", lambda i, p: {
+        "url": "/preview", "params": {"home": p[0], "away": p[1], "league": BENCH_LEAGUE},
+    }),
+    "route_power_table": _route_bench("get", lambda i, p: {
+        "url": "/power_table", "params": {"league": BENCH_LEAGUE},
+    }),
+    "route_teams": _route_bench("get", lambda i, p: {
+        "url": "/teams", "params": {"league": BENCH_LEAGUE},
+    }),
+}
+
+
+def prepare_state(csv_path, work_dir, seed):
+    """Loads the size once and builds everything the benchmarks share."""
+    state = {"csv": csv_path, "cache_dir": work_dir / "cache"}
+    with contextlib.redirect_stdout(io.StringIO()):
+        state["df"], _ = schemas.read_matches(csv_path)
+        state["manager"] = LeagueManager(use_cache=False)
+
+        # Snapshot for the warm-load benchmark
+        LeagueManager(cache_dir=state["cache_dir"]).load_league(BENCH_LEAGUE, csv_path)
+
+        from fastapi.testclient import TestClient
+        from services import api
+        api.league_manager.register_league(BENCH_LEAGUE, csv_path)
+        api.league_manager.load_league(BENCH_LEAGUE, csv_path)
+        state["ctx"] = api.league_manager.get_league(BENCH_LEAGUE)
+        state["client"] = TestClient(api.app)
+
+    teams = list(state["ctx"]["team_names"])
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(teams), (PREDICT_CALLS, 2))
+    idx[:, 1] = np.where(idx[:, 0] == idx[:, 1], (idx[:, 1] + 1) % len(teams), idx[:, 1])
+    state["pairs"] = [(teams[i], teams[j]) for i, j in idx]
+    return state
+
+
+def run_suite(sizes, names, repeat, seed, data_dir=None):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for size in sizes:
+            n_matches, n_teams = parse_size(size)
+            csv_dir = Path(data_dir) if data_dir else tmp
+            csv_path = csv_dir / f"synthetic_{n_matches}x{n_teams}_s{seed}.csv"
+            if not csv_path.exists():
+                print(f"Generating {size} ...")
+                write_csv(csv_path, n_matches, n_teams, seed)
+
+            state = prepare_state(csv_path, tmp / size, seed)
+            for name in names:
+                fn, calls = BENCHMARKS[name](state)
+                runs = timed(fn, repeat, calls)
+                row = summarize(name, size, runs, calls)
+                results.append(row)
+                print(f"  {size:>14} {name:<24} median {row['median_s'] * 1000:10.3f} ms/call")
+            state["client"].close()
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Median ratio (current / baseline) per (name, size) present in both.
+    Returns rows with "ratio" and "status" ("regression" / "improved" / "ok").
+    """
+    base = {(r["name"], r["size"]): r for r in baseline["results"]}
+    rows = []
+    for r in results:
+        b = base.get((r["name"], r["size"]))
+        if b is None or not b["median_s"]:
+            continue
+        ratio = r["median_s"] / b["median_s"]
+        status = "regression" if ratio > threshold else "improved" if ratio < 1 / threshold else "ok"
+        rows.append({"name": r["name"], "size": r["size"], "baseline_s": b["median_s"],
+                     "current_s": r["median_s"], "ratio": ratio, "status": status})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths on synthetic data at several scales.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="<matches>x<teams>, e.g. 10000x20 1e6x500")
+    parser.add_argument("--only", nargs="+", default=None, choices=sorted(BENCHMARKS), metavar="NAME",
+                        help=f"Subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None, help="Keep generated CSVs here (reused across runs)")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Slowdown ratio flagged as a regression")
+    args = parser.parse_args(argv)
+
+    names = args.only or list(BENCHMARKS)
+    results = run_suite(args.sizes, names, args.repeat, args.seed, args.data_dir)
+    report = {"environment": environment(), "repeat": args.repeat, "seed": args.seed, "results": results}
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        report["comparison"] = compare(results, baseline, args.threshold)
+        print(f"\nAgainst {args.compare} (threshold x{args.threshold:.2f}):")
+        for row in report["comparison"]:
+            flag = {"regression": "[SLOWER]", "improved": "[FASTER]", "ok": ""}[row["status"]]
+            print(f"  {row['size']:>14} {row['name']:<24} x{row['ratio']:.2f} {flag}")
+        regressions = [r for r in report["comparison"] if r["status"] == "regression"]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) found.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
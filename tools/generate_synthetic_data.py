@@ -0,0 +1,112 @@
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Written in chunks so 10M-match files never sit in memory at once
+CHUNK_MATCHES = 500_000
+
+# football-data.co.uk layout (results + a few odds columns so rows are realistically wide)
+RESULT_COLUMNS = ["Div", "Date", "Time", "HomeTeam", "AwayTeam", "FTHG", "FTAG", "FTR", "HTHG", "HTAG", "HTR"]
+ODDS_COLUMNS = ["B365H", "B365D", "B365A", "BWH", "BWD", "BWA", "PSH", "PSD", "PSA", "AvgH", "AvgD", "AvgA"]
+
+# Goal rates before the strength adjustment
+HOME_RATE = 1.45
+AWAY_RATE = 1.15
+
+
+def team_names(n_teams):
+    return [f"Team {i:04d}" for i in range(n_teams)]
+
+
+def iter_matches(n_matches, n_teams, seed=0, years=30, start="1995-08-01"):
+    """
+    Yields football-data-shaped DataFrame chunks: matchdays of random pairings
+    (every team plays once per matchday), Poisson goals driven by a fixed
+    latent strength per team, dates spread evenly over `years`.
+    """
+    if n_teams < 2:
+        raise ValueError("Need at least 2 teams.")
+    rng = np.random.default_rng(seed)
+    names = np.array(team_names(n_teams), dtype=object)
+    strength = rng.normal(0, 0.35, n_teams)
+
+    per_day = n_teams // 2
+    n_days = -(-n_matches // per_day)
+    span_days = max(1, int(years * 365.25))
+    start = np.datetime64(start, "D")
+
+    done = 0
+    day = 0
+    while done < n_matches:
+        days = min(n_days - day, max(1, CHUNK_MATCHES // per_day))
+        # Random pairing per matchday: shuffled teams, paired off in twos
+        order = rng.random((days, n_teams)).argsort(axis=1)[:, : per_day * 2]
+        home = order[:, 0::2].ravel()
+        away = order[:, 1::2].ravel()
+        day_idx = np.repeat(np.arange(day, day + days), per_day)
+
+        take = min(len(home), n_matches - done)
+        home, away, day_idx = home[:take], away[:take], day_idx[:take]
+
+        diff = strength[home] - strength[away]
+        fthg = rng.poisson(HOME_RATE * np.exp(diff))
+        ftag = rng.poisson(AWAY_RATE * np.exp(-diff))
+        hthg = rng.binomial(fthg, 0.45)
+        htag = rng.binomial(ftag, 0.45)
+
+        dates = start + (day_idx * span_days // n_days).astype("timedelta64[D]")
+        unique_dates, inverse = np.unique(dates, return_inverse=True)
+        date_str = np.array([d.strftime("%d/%m/%Y") for d in unique_dates.astype(datetime.date)], dtype=object)
+
+        chunk = pd.DataFrame({
+            "Div": "SYN",
+            "Date": date_str[inverse],
+            "Time": "15:00",
+            "HomeTeam": names[home],
+            "AwayTeam": names[away],
+            "FTHG": fthg,
+            "FTAG": ftag,
+            "FTR": np.where(fthg > ftag, "H", np.where(fthg < ftag, "A", "D")),
+            "HTHG": hthg,
+            "HTAG": htag,
+            "HTR": np.where(hthg > htag, "H", np.where(hthg < htag, "A", "D")),
+        })
+        odds = np.round(rng.uniform(1.2, 9.0, (take, len(ODDS_COLUMNS))), 2)
+        for j, col in enumerate(ODDS_COLUMNS):
+            chunk[col] = odds[:, j]
+
+        yield chunk
+        done += take
+        day += days
+
+
+def write_csv(path, n_matches, n_teams, seed=0, years=30):
+    """Writes a synthetic football-data CSV and returns its path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", newline="") as f:
+        for i, chunk in enumerate(iter_matches(n_matches, n_teams, seed, years)):
+            chunk.to_csv(f, index=False, header=(i == 0))
+    tmp.replace(path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic football-data.co.uk style results CSV.")
+    parser.add_argument("--matches", type=int, default=10_000, help="Number of matches (e.g. 10000 to 10000000)")
+    parser.add_argument("--teams", type=int, default=20, help="Number of teams (e.g. 20 to 5000)")
+    parser.add_argument("--years", type=float, default=30, help="Date range the matches are spread over")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="CSV path (default: synthetic_<matches>x<teams>.csv)")
+    args = parser.parse_args(argv)
+
+    output = args.output or f"synthetic_{args.matches}x{args.teams}.csv"
+    path = write_csv(output, args.matches, args.teams, args.seed, args.years)
+    print(f"Wrote {args.matches} matches between {args.teams} teams to {path}")
+
+
+if __name__ == "__main__":
+    main()
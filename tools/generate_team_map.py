@@ -1,78 +1,182 @@
 import sys
 import os
 import json
-import pandas as pd
+import argparse
+import asyncio
 from pathlib import Path
 import time
 
 # Add parent directory to path to import services
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.external_data import search_team_id
+from services import external_data
+from services.schemas import read_matches
 
 DATA_DIR = Path(r"C:\WEB_PROJECTS\Ball_Knowledge\data")
 OUTPUT_FILE = DATA_DIR / "team_id_map.json"
 
-def get_unique_teams():
+# API-Football free tier allows roughly 1 call/sec; raise --rate on paid plans
+DEFAULT_RATE = 0.8
+DEFAULT_BURST = 1
+DEFAULT_WORKERS = 8
+
+def get_unique_teams(data_dir=DATA_DIR):
     teams = set()
     print("Scaning CSVs for teams...")
-    for file in DATA_DIR.glob("*.csv"):
+    for file in Path(data_dir).glob("*.csv"):
         print(f"  -> Reading {file.name}")
         try:
-            # Try Latin1 then UTF-8
-            try:
-                df = pd.read_csv(file, encoding='latin1')
-            except:
-                df = pd.read_csv(file, encoding='utf-8')
-            
-            # Check for HomeTeam or Home Team
-            if "HomeTeam" in df.columns:
-                teams.update(df["HomeTeam"].dropna().unique())
-            elif "Home Team" in df.columns:
-                teams.update(df["Home Team"].dropna().unique())
-            
+            # Only the team columns, via the source schema registry
+            df, _ = read_matches(file)
+            if df is None:
+                continue
+            teams.update(df["home"].dropna().unique())
+            teams.update(df["away"].dropna().unique())
+
         except Exception as e:
             print(f"Error reading {file}: {e}")
-            
+
     return sorted(list(teams))
 
-def main():
-    teams = get_unique_teams()
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/sec, up to `burst` saved up."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# ---------------- JOURNAL ----------------
+# One JSON line per resolved team: {"team": ..., "id": <int or null>}.
+# null = searched but not found. Later lines win.
+def journal_path(output_file):
+    return Path(output_file).with_suffix(".journal.jsonl")
+
+def read_journal(path):
+    found, failed = {}, set()
+    if not path.exists():
+        return found, failed
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial last line from an interrupted run
+            if entry.get("id"):
+                found[entry["team"]] = entry["id"]
+                failed.discard(entry["team"])
+            else:
+                failed.add(entry["team"])
+                found.pop(entry["team"], None)
+    return found, failed
+
+def write_json_atomic(path, data):
+    tmp = Path(path).with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp, path)
+
+
+async def resolve_teams(teams, journal, rate=DEFAULT_RATE, burst=DEFAULT_BURST, workers=DEFAULT_WORKERS):
+    """
+    Searches teams concurrently (at most `workers` in flight, `rate` calls/sec)
+    and appends each answer to the journal as it arrives.
+    Returns {team: id or None}; teams whose request errored are left out.
+    """
+    bucket = TokenBucket(rate, burst)
+    sem = asyncio.Semaphore(workers)
+    results = {}
+    done = 0
+
+    with open(journal, "a") as jf:
+        async def resolve(team):
+            nonlocal done
+            async with sem:
+                await bucket.acquire()
+                try:
+                    tid = await external_data.search_team_id_async(team, raise_errors=True)
+                except Exception as e:
+                    print(f"[ERR] '{team}': {e} (will retry next run)")
+                    return
+            results[team] = tid
+            jf.write(json.dumps({"team": team, "id": tid}) + "\n")
+            jf.flush()
+            done += 1
+            status = f"[OK] Found: {tid}" if tid else "[FAIL] Not Found"
+            print(f"[{done}/{len(teams)}] '{team}' {status}")
+
+        await asyncio.gather(*(resolve(t) for t in teams))
+        await external_data.aclose()
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve API-Football team ids for every team in the data CSVs.")
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    parser.add_argument("--output", default=None, help="Mapping file (default: <data-dir>/team_id_map.json)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Max API calls per second")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Max concurrent requests")
+    parser.add_argument("--force", action="store_true", help="Retry teams that previously weren't found")
+    parser.add_argument("--base-url", default=None, help="Override API base URL (e.g. a local stub server)")
+    args = parser.parse_args(argv)
+
+    if args.base_url:
+        # A local stub doesn't check the key, but the client only calls out with one set
+        external_data.BASE_URL = args.base_url
+        external_data.API_KEY = external_data.API_KEY or "stub"
+    elif not external_data.API_KEY:
+        print("API_FOOTBALL_KEY is not set; nothing can be resolved.")
+        return
+
+    output_file = Path(args.output) if args.output else Path(args.data_dir) / "team_id_map.json"
+    journal = journal_path(output_file)
+
+    teams = get_unique_teams(args.data_dir)
     print(f"Found {len(teams)} unique teams.")
-    
+
     # Load existing if exists
     mapping = {}
-    if OUTPUT_FILE.exists():
-        with open(OUTPUT_FILE, "r") as f:
+    if output_file.exists():
+        with open(output_file, "r") as f:
             mapping = json.load(f)
-            
-    print(f"Loaded {len(mapping)} existing mappings.")
-    
+
+    # Pick up where an interrupted run stopped
+    journal_found, journal_failed = read_journal(journal)
+    mapping.update(journal_found)
+    print(f"Loaded {len(mapping)} existing mappings ({len(journal_found)} from journal, {len(journal_failed)} known failures).")
+
     # Filter for missing
-    missing = [t for t in teams if t not in mapping]
+    missing = [t for t in teams if t not in mapping and (args.force or t not in journal_failed)]
     print(f"Need to resolve {len(missing)} teams.")
-    
-    for i, team in enumerate(missing):
-        print(f"[{i+1}/{len(missing)}] Searching for '{team}'...", end=" ", flush=True)
-        tid = search_team_id(team)
-        if tid:
-            mapping[team] = tid
-            print(f"[OK] Found: {tid}")
-        else:
-            print("[FAIL] Not Found")
-        
-        # Rate limit (API-Football Free Tier: 1 call/sec roughly, safer to be slow)
-        time.sleep(1.2)
-        
-        # Autosave every 10
-        if i % 10 == 0:
-            with open(OUTPUT_FILE, "w") as f:
-                json.dump(mapping, f, indent=4)
-                
-    # Final Save
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(mapping, f, indent=4)
-        
+
+    if missing:
+        results = asyncio.run(resolve_teams(missing, journal, args.rate, args.burst, args.workers))
+        mapping.update({t: tid for t, tid in results.items() if tid})
+        journal_failed = (journal_failed - set(results)) | {t for t, tid in results.items() if not tid}
+
+    # Merge: mapping file gets every hit; the journal is compacted to just the failures
+    write_json_atomic(output_file, dict(sorted(mapping.items())))
+    with open(journal, "w") as f:
+        for team in sorted(journal_failed):
+            f.write(json.dumps({"team": team, "id": None}) + "\n")
+
     print("Done! Mapping saved.")
 
 if __name__ == "__main__":
@@ -0,0 +1,44 @@
+import sys
+import os
+import argparse
+from pathlib import Path
+
+# Add parent directory to path to import services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import profiling
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate request profiles written by the API (sampled or on demand).")
+    parser.add_argument("--dir", default=str(profiling.PROFILE_DIR), help="Profile directory (PROFILE_DIR)")
+    parser.add_argument("--route", default=None, help="Only this route, e.g. /predict or /predict/batch")
+    parser.add_argument("--method", default=None, help="Only this HTTP method, e.g. GET")
+    parser.add_argument("--mode", default=None, choices=["request", "sampled"])
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key (cumulative, tottime, ncalls, ...)")
+    parser.add_argument("--limit", type=int, default=40)
+    parser.add_argument("--output", default=None, help="Also write the merged profile here (.prof, for snakeviz etc.)")
+    args = parser.parse_args(argv)
+
+    # <time>_<METHOD>_<route>_<mode>_<id>.prof
+    pattern = "*_{}_{}_{}_*.prof".format(
+        args.method.upper() if args.method else "*",
+        profiling._slug(args.route) if args.route else "*",
+        args.mode or "*",
+    )
+    paths = sorted(Path(args.dir).glob(pattern))
+    if not paths:
+        print(f"No profiles matching {pattern} in {args.dir}")
+        return 1
+
+    stats = profiling.aggregate(paths)
+    print(f"{len(paths)} profile(s) from {paths[0].name} to {paths[-1].name}\n")
+    print(profiling.report(stats, args.sort, args.limit))
+    if args.output:
+        stats.dump_stats(args.output)
+        print(f"Merged profile written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import sys
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path to import services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from models import backtest
+from services import schemas
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+# Default grid: 8 x 286 x 3 x 3 x 11 x 9 = ~2M configs
+DEFAULT_KS = [10, 15, 20, 25, 30, 40, 50, 60]
+DEFAULT_WEIGHT_STEP = 0.1
+DEFAULT_ELO_SCALES = [300, 400, 500]
+DEFAULT_POWER_SCALES = [8, 12, 16]
+DEFAULT_ELO_WEIGHTS = [round(0.3 + 0.05 * i, 2) for i in range(11)]
+DEFAULT_BASE_DRAWS = [round(0.16 + 0.02 * i, 2) for i in range(9)]
+
+# Left out unless named with --files: the World Cup feed repeats matches already in
+# the international results (under year-only dates and older team names, so they
+# can't be de-duplicated) and would count them twice
+DEFAULT_SKIP_SCHEMAS = {"world_cup"}
+
+
+def load_datasets(paths, warmup, skip_schemas=()):
+    """{file stem: prepared arrays} for every CSV in a known layout (others skipped)."""
+    datasets = {}
+    for path in paths:
+        schema = schemas.sniff_schema(path)
+        if schema is None:
+            print(f"⚠️ Skipping {path.name}: unknown layout")
+            continue
+        if schema in skip_schemas:
+            print(f"⚠️ Skipping {path.name}: {schema} matches overlap another feed (pass it in --files to include)")
+            continue
+        df, _ = schemas.read_matches(path)
+        if df is None or len(df) < 2:
+            continue
+        datasets[path.stem] = backtest.prepare_matches(df, warmup)
+        print(f"  {path.stem:<32} {len(df):>7} matches  {len(datasets[path.stem]['teams']):>5} teams")
+    return datasets
+
+
+def _fmt(cfg):
+    w = "/".join(f"{v:g}" for v in cfg["power_weights"])
+    return (f"K={cfg['k']:<4g} weights={w:<20} elo_scale={cfg['elo_scale']:<4g} "
+            f"power_scale={cfg['power_scale']:<3g} elo_weight={cfg['elo_weight']:<5g} draw={cfg['base_draw']:<5g}")
+
+
+def evaluate_all(datasets, cfg):
+    """Per-league evaluate() plus the match-weighted pooled scores."""
+    per = {name: backtest.evaluate(data, cfg) for name, data in datasets.items()}
+    n = sum(r["n"] for r in per.values())
+    pooled = {"n": n}
+    for key in ("log_loss", "brier", "ece"):
+        pooled[key] = sum(r[key] * r["n"] for r in per.values() if r["n"]) / max(n, 1)
+    return pooled, per
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward grid search over the model constants (Elo K, power weights, blend, draw rate).")
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+    parser.add_argument("--files", nargs="+", default=None, help="CSV names in --data-dir (default: every known layout except the World Cup feed)")
+    parser.add_argument("--ks", nargs="+", type=float, default=DEFAULT_KS)
+    parser.add_argument("--weight-step", type=float, default=DEFAULT_WEIGHT_STEP, help="Power weight simplex step")
+    parser.add_argument("--elo-scales", nargs="+", type=float, default=DEFAULT_ELO_SCALES)
+    parser.add_argument("--power-scales", nargs="+", type=float, default=DEFAULT_POWER_SCALES)
+    parser.add_argument("--elo-weights", nargs="+", type=float, default=DEFAULT_ELO_WEIGHTS)
+    parser.add_argument("--base-draws", nargs="+", type=float, default=DEFAULT_BASE_DRAWS)
+    parser.add_argument("--warmup", type=float, default=0.1, help="Fraction of each league's matches not scored")
+    parser.add_argument("--metric", choices=["log_loss", "brier"], default="log_loss")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default=None, help="Write the report JSON here")
+    args = parser.parse_args(argv)
+
+    data_dir = Path(args.data_dir)
+    paths = [data_dir / f for f in args.files] if args.files else sorted(data_dir.glob("*.csv"))
+    print("Loading leagues...")
+    datasets = load_datasets(paths, args.warmup, () if args.files else DEFAULT_SKIP_SCHEMAS)
+    if not datasets:
+        print("No usable CSVs found.")
+        return 1
+
+    grid = {
+        "k": args.ks,
+        "power_weights": backtest.weight_simplex(args.weight_step),
+        "elo_scale": args.elo_scales,
+        "power_scale": args.power_scales,
+        "elo_weight": args.elo_weights,
+        "base_draw": args.base_draws,
+    }
+    print(f"\nScoring {backtest.grid_size(grid):,} configs on {len(datasets)} leagues with {args.workers} worker(s)...")
+    start = time.perf_counter()
+    result = backtest.search(datasets, grid, workers=args.workers)
+    print(f"Done in {time.perf_counter() - start:.1f}s ({result['n']:,} scored matches).\n")
+
+    baseline = backtest.default_params()
+    base_pooled, base_per = evaluate_all(datasets, baseline)
+    print(f"Current constants: log_loss {base_pooled['log_loss']:.4f}  brier {base_pooled['brier']:.4f}  ece {base_pooled['ece']:.4f}")
+    print(f"  {_fmt(baseline)}\n")
+
+    top = backtest.top_configs(result, args.metric, args.top)
+    print(f"Top {len(top)} by {args.metric} (ece from a full re-run of each):")
+    report_top = []
+    for cfg in top[backtest.PARAM_NAMES].to_dict("records"):
+        pooled, per = evaluate_all(datasets, cfg)
+        report_top.append({"params": cfg, "pooled": pooled, "per_league": per})
+        print(f"  log_loss {pooled['log_loss']:.4f}  brier {pooled['brier']:.4f}  ece {pooled['ece']:.4f}  {_fmt(cfg)}")
+
+    if args.output:
+        report = {
+            "grid": {k: [list(v) if isinstance(v, tuple) else v for v in vals] for k, vals in grid.items()},
+            "configs": backtest.grid_size(grid),
+            "warmup": args.warmup,
+            "metric": args.metric,
+            "baseline": {"params": baseline, "pooled": base_pooled, "per_league": base_per},
+            "top": report_top,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=lambda o: o.tolist() if isinstance(o, np.ndarray) else str(o))
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
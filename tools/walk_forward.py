@@ -0,0 +1,65 @@
+import sys
+import os
+import math
+import time
+import argparse
+
+# Add parent directory to path to import services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import backtest
+from services import schemas
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def with_scores(records, totals):
+    """Passes records through, adding each played match's log-loss / Brier to `totals`."""
+    for r in records:
+        if r["outcome"] is not None:
+            y = {"H": "home_win", "D": "draw", "A": "away_win"}[r["outcome"]]
+            totals["n"] += 1
+            totals["log_loss"] += -math.log(max(r[y], backtest.PROB_EPS))
+            totals["brier"] += sum((r[c] - (c == y)) ** 2 for c in ("home_win", "draw", "away_win"))
+        yield r
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-match predictions for every historical match in one pass (walk-forward).")
+    parser.add_argument("csv", help="Match CSV in any known layout, in date order")
+    parser.add_argument("--output", required=True, help=".csv or .parquet (Parquet needs pyarrow)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows read and written per chunk")
+    parser.add_argument("--k", type=float, default=backtest.DEFAULT_K)
+    parser.add_argument("--power-weights", nargs=4, type=float, default=list(backtest.DEFAULT_POWER_WEIGHTS),
+                        metavar=("ELO", "ATTACK", "DEFENCE", "FORM"))
+    parser.add_argument("--elo-scale", type=float, default=backtest.DEFAULT_ELO_SCALE)
+    parser.add_argument("--power-scale", type=float, default=backtest.DEFAULT_POWER_SCALE)
+    parser.add_argument("--elo-weight", type=float, default=backtest.DEFAULT_ELO_WEIGHT)
+    parser.add_argument("--base-draw", type=float, default=backtest.DEFAULT_BASE_DRAW)
+    args = parser.parse_args(argv)
+
+    schema_name = schemas.sniff_schema(args.csv)
+    if schema_name is None:
+        print(f"⚠️ Unknown CSV layout in {args.csv}. Known: {list(schemas.SOURCE_SCHEMAS)}")
+        return 1
+
+    params = {
+        "k": args.k, "power_weights": tuple(args.power_weights), "elo_scale": args.elo_scale,
+        "power_scale": args.power_scale, "elo_weight": args.elo_weight, "base_draw": args.base_draw,
+    }
+    totals = {"n": 0, "log_loss": 0.0, "brier": 0.0}
+    start = time.perf_counter()
+    records = backtest.iter_predictions(schemas.iter_matches(args.csv, schema_name, args.chunksize), params)
+    try:
+        rows = backtest.write_predictions(with_scores(records, totals), args.output, args.chunksize)
+    except ImportError as e:
+        print(f"⚠️ {e}")
+        return 1
+    print(f"✅ {rows} predictions written to {args.output} in {time.perf_counter() - start:.1f}s")
+    if totals["n"]:
+        print(f"   log_loss {totals['log_loss'] / totals['n']:.4f}  brier {totals['brier'] / totals['n']:.4f}  ({totals['n']} played matches)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())